@@ -0,0 +1,158 @@
+"""
+Bayesian A/B tests for many segments at once, in a single PyMC model.
+
+A segment is a dict of column -> value, built as a cross product with --by or listed in a
+JSON file. Arms split at the median of --arm-col, as in clean_and_split. Each (segment, arm)
+cell enters the model only through its (n, mean, m2), so fitting cost does not grow with rows.
+With --pooling hierarchical (the default) arms share a population mean across segments and
+small segments are shrunk toward it. --pooling none gives independent fits. The output is one
+row per segment with the posterior of mu_B - mu_A and P(B > A).
+
+Usage:
+    python bin/ab_segments.py --by region_code
+    python bin/ab_segments.py --by region_code spending_class --pooling none --output segment_ab_results.csv
+    python bin/ab_segments.py --segments segments.json
+"""
+import json
+import inspect
+import logging
+import argparse
+import itertools
+
+# Importing the single-test script configures the PyTensor backend before pymc loads
+from ab_test_bayesian_spending import SAMPLER_CHAINS, SAMPLER_SETTINGS, normal_loglik, sample_model
+
+import numpy as np
+import pandas as pd
+import arviz as az
+import pymc as pm
+from ab_stats import NormalStats, assign_arms, cross_segments, segment_label
+from columnar_cache import read_csv_cached
+
+logger = logging.getLogger(__name__)
+
+ARMS = ["A", "B"]
+HDI_PROB = 0.94
+MIN_ARM_SIZE = 5  # tinier cells give funnel-shaped (mu, sigma) posteriors and divergences
+
+
+def segment_stats(df: pd.DataFrame, segments: list):
+    """
+    Per-(segment, arm) sufficient statistics as arrays shaped (n_segments, 2).
+    Segments sharing the same columns are computed with one groupby.
+    """
+    n = np.zeros((len(segments), 2))
+    mean = np.zeros((len(segments), 2))
+    m2 = np.zeros((len(segments), 2))
+
+    by_keys = {}
+    for i, segment in enumerate(segments):
+        by_keys.setdefault(tuple(segment), []).append(i)
+
+    for keys, rows in by_keys.items():
+        grouped = df.groupby([*keys, "arm"], observed=True)["y"]
+        table = pd.DataFrame({
+            "n": grouped.size(),
+            "mean": grouped.mean(),
+            "m2": grouped.var(ddof=0) * grouped.size(),
+        })
+        for i in rows:
+            for arm in (0, 1):
+                key = (*segments[i].values(), arm) if keys else arm
+                if key in table.index:
+                    n[i, arm], mean[i, arm], m2[i, arm] = table.loc[key]
+
+    return NormalStats(n, mean, m2)
+
+
+def build_segment_model(stats: NormalStats, labels, pooling="hierarchical"):
+    coords = {"segment": labels, "arm": ARMS}
+    with pm.Model(coords=coords) as model:
+        if pooling == "hierarchical":
+            # Non-centered: mu[s, arm] = population mean of the arm + tau[arm] * z[s, arm]
+            overall = float((stats.n * stats.mean).sum() / stats.n.sum())
+            mu_arm = pm.Normal("mu_arm", mu=overall, sigma=10, dims="arm")
+            tau = pm.HalfNormal("tau", sigma=1, dims="arm")
+            z = pm.Normal("z", mu=0, sigma=1, dims=("segment", "arm"))
+            mu = pm.Deterministic("mu", mu_arm + tau * z, dims=("segment", "arm"))
+        else:
+            mu = pm.Normal("mu", mu=stats.mean, sigma=10, dims=("segment", "arm"))
+        sigma = pm.HalfNormal("sigma", sigma=10, dims=("segment", "arm"))
+
+        pm.Potential("loglik", normal_loglik(mu, sigma, stats).sum())
+
+        diff = pm.Deterministic("diff", mu[:, 1] - mu[:, 0], dims="segment")
+
+    return model
+
+
+def summarize_segments(trace, segments, stats: NormalStats, hdi_prob=HDI_PROB) -> pd.DataFrame:
+    diff = trace.posterior["diff"]
+    hdi = az.hdi(trace, var_names=["diff"], hdi_prob=hdi_prob)["diff"]
+    table = pd.DataFrame(segments)
+    table.insert(0, "segment", [segment_label(s) for s in segments])
+    return table.assign(
+        n_a=stats.n[:, 0].astype(int),
+        n_b=stats.n[:, 1].astype(int),
+        diff_mean=diff.mean(("chain", "draw")).values,
+        diff_sd=diff.std(("chain", "draw")).values,
+        hdi_low=hdi.sel(hdi="lower").values,
+        hdi_high=hdi.sel(hdi="higher").values,
+        p_b_gt_a=(diff > 0).mean(("chain", "draw")).values,
+    )
+
+
+def run_segments(df: pd.DataFrame, segments: list, pooling="hierarchical", arm_col="income_range_code"):
+    """Fit every segment in one model and return the per-segment results table."""
+    df = assign_arms(df, arm_col)
+    stats = segment_stats(df, segments)
+
+    keep = (stats.n >= MIN_ARM_SIZE).all(axis=1)
+    for segment in itertools.compress(segments, ~keep):
+        logger.warning(f"Skipping segment {segment_label(segment)}: fewer than {MIN_ARM_SIZE} rows in an arm")
+    segments = list(itertools.compress(segments, keep))
+    stats = NormalStats(*(a[keep] for a in stats))
+    if not segments:
+        raise ValueError("No segment has enough rows in both arms.")
+
+    labels = [segment_label(s) for s in segments]
+    logger.info(f"Fitting {len(segments)} segments in one {pooling} model...")
+    model = build_segment_model(stats, labels, pooling)
+    trace = sample_model(
+        model,
+        {"n": stats.n, "mean": stats.mean, "m2": stats.m2, "labels": np.array(labels)},
+        inspect.getsource(build_segment_model) + inspect.getsource(normal_loglik) + pooling,
+    )
+    return summarize_segments(trace, segments, stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bayesian A/B test of spending across many segments at once.")
+    parser.add_argument("--data", default="data/consumer_spending.csv")
+    parser.add_argument("--by", nargs="+", default=["region_code"], help="Segment by every combination of these columns")
+    parser.add_argument("--segments", help="JSON file with a list of segment definitions (overrides --by)")
+    parser.add_argument("--arm-col", default="income_range_code", help="A/B split at the median of this column")
+    parser.add_argument("--pooling", choices=["hierarchical", "none"], default="hierarchical")
+    parser.add_argument("--output", help="Write the per-segment table as CSV")
+    args = parser.parse_args()
+
+    if args.segments:
+        with open(args.segments) as f:
+            segments = json.load(f)
+    else:
+        segments = None
+
+    segment_cols = sorted({k for s in segments for k in s}) if segments else args.by
+    df = read_csv_cached(args.data, columns=list(dict.fromkeys(["total_annual_spending", args.arm_col, *segment_cols])))
+    if segments is None:
+        segments = cross_segments(df, args.by)
+
+    logger.info(f"🚀 Batched A/B test over {len(segments)} segments ({SAMPLER_CHAINS} chains x {SAMPLER_SETTINGS['draws']} draws)")
+    results = run_segments(df, segments, pooling=args.pooling, arm_col=args.arm_col)
+
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print("\n🧾 Per-segment posterior of μ_B - μ_A:\n", results.drop(columns=segment_cols).round(3).to_string(index=False))
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\n📄 Results written to {args.output}")
@@ -0,0 +1,107 @@
+"""
+Sufficient statistics and the conjugate posterior for Normal A/B groups.
+
+NormalStats(n, mean, m2) summarizes a group exactly under a Normal likelihood, where m2 is the
+sum of squared deviations from the mean. Stats from separate batches merge without loss. The
+Normal-Inverse-Gamma update and its posterior draws cost the same however many rows went in.
+The arm and segment helpers at the bottom are shared by ab_segments.py and frequentist.py, so
+the Bayesian and frequentist tables compare exactly the same groups.
+"""
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+
+
+class NormalStats(NamedTuple):
+    n: int
+    mean: float
+    m2: float
+
+    @classmethod
+    def from_array(cls, x) -> "NormalStats":
+        x = np.asarray(x, dtype="float64")
+        if x.size == 0:
+            return cls(0, 0.0, 0.0)
+        mean = float(x.mean())
+        return cls(int(x.size), mean, float(((x - mean) ** 2).sum()))
+
+    def merge(self, other: "NormalStats") -> "NormalStats":
+        if self.n == 0:
+            return other
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.n / n
+        m2 = self.m2 + other.m2 + delta ** 2 * self.n * other.n / n
+        return NormalStats(n, mean, m2)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else float("nan")
+
+
+class NIGPosterior(NamedTuple):
+    """mu | sigma^2 ~ Normal(m, sigma^2 / kappa),  sigma^2 ~ InvGamma(alpha, beta)."""
+    m: float
+    kappa: float
+    alpha: float
+    beta: float
+
+    def update(self, stats: NormalStats) -> "NIGPosterior":
+        """Conjugate update with a batch's sufficient statistics; the result is the next prior."""
+        if stats.n == 0:
+            return self
+        kappa = self.kappa + stats.n
+        m = (self.kappa * self.m + stats.n * stats.mean) / kappa
+        alpha = self.alpha + stats.n / 2
+        beta = self.beta + 0.5 * stats.m2 + self.kappa * stats.n * (stats.mean - self.m) ** 2 / (2 * kappa)
+        return NIGPosterior(m, kappa, alpha, beta)
+
+    def mu_marginal(self):
+        """Student-t marginal of mu as (df, loc, scale)."""
+        return 2 * self.alpha, self.m, float(np.sqrt(self.beta / (self.alpha * self.kappa)))
+
+    def sample(self, size, rng=None):
+        """Joint draws of (mu, sigma), each shaped `size`."""
+        rng = np.random.default_rng(rng)
+        sigma2 = self.beta / rng.gamma(self.alpha, 1.0, size=size)
+        mu = rng.normal(self.m, np.sqrt(sigma2 / self.kappa))
+        return mu, np.sqrt(sigma2)
+
+
+# Weak prior: mu within ~10 sigma of m0, sigma^2 ~ InvGamma(1, 1)
+DEFAULT_KAPPA0 = 0.01
+DEFAULT_ALPHA0 = 1.0
+DEFAULT_BETA0 = 1.0
+
+
+def weak_prior(m0=0.0, kappa0=DEFAULT_KAPPA0, alpha0=DEFAULT_ALPHA0, beta0=DEFAULT_BETA0) -> NIGPosterior:
+    return NIGPosterior(float(m0), kappa0, alpha0, beta0)
+
+
+def conjugate_ab_draws(post_a: NIGPosterior, post_b: NIGPosterior, chains=2, draws=2000, seed=None) -> dict:
+    """Posterior draws of mu_a, mu_b, sigma_a, sigma_b and diff, shaped (chains, draws)."""
+    rng = np.random.default_rng(seed)
+    mu_a, sigma_a = post_a.sample((chains, draws), rng)
+    mu_b, sigma_b = post_b.sample((chains, draws), rng)
+    return {"mu_a": mu_a, "mu_b": mu_b, "sigma_a": sigma_a, "sigma_b": sigma_b, "diff": mu_b - mu_a}
+
+
+# --- Arms and segments ---
+def assign_arms(df: pd.DataFrame, arm_col="income_range_code", value_col="total_annual_spending"):
+    """Add `arm` (0 = A, 1 = B, split at the median of arm_col) and `y` (log1p spending)."""
+    df = df.dropna(subset=[value_col, arm_col])
+    df = df[df[value_col] > -1]
+    cutoff = df[arm_col].median()
+    return df.assign(arm=(df[arm_col] > cutoff).astype("int8"), y=np.log1p(df[value_col]))
+
+
+def cross_segments(df: pd.DataFrame, by) -> list:
+    """One segment per observed combination of the `by` columns."""
+    combos = df[list(by)].dropna().drop_duplicates().sort_values(list(by))
+    return [dict(zip(by, row)) for row in combos.itertuples(index=False)]
+
+
+def segment_label(segment: dict) -> str:
+    return " & ".join(f"{k}={v}" for k, v in segment.items()) or "all"
@@ -1,13 +1,25 @@
 import os
+import inspect
 import logging
+import argparse
+from sampler_backend import configure_pytensor, enable_jax_cpu_devices, sample_with_fallback
+
+# Pick the sampler backend before PyTensor is imported: the C linker when a compiler
+# exists (linker=py otherwise), or nutpie/numpyro/blackjax if installed.
+# SAMPLER_BACKEND=auto|nutpie|numpyro|blackjax|pymc|python, SAMPLER_CHAINS=<n>
+SAMPLER_BACKEND = configure_pytensor(os.environ.get("SAMPLER_BACKEND", "auto"))
+SAMPLER_CHAINS = int(os.environ.get("SAMPLER_CHAINS", "2"))
+enable_jax_cpu_devices(SAMPLER_CHAINS)
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import arviz as az
 import pymc as pm
-
-# Force PyTensor to run in Python-only mode (safer inside Codespaces)
-os.environ["PYTENSOR_FLAGS"] = "mode=FAST_RUN,linker=py"
+from columnar_cache import read_csv_cached
+from trace_cache import cached_sample
+from instrument import stage
+from ab_stats import NormalStats, weak_prior, conjugate_ab_draws
 
 # --- Configure Logging ---
 logging.basicConfig(
@@ -37,9 +49,10 @@ def clean_and_split(df: pd.DataFrame):
     logger.info(f"Group A samples: {len(group_a)} | Group B samples: {len(group_b)}")
     return group_a, group_b
 
-def run_model(group_a, group_b):
-    logger.info("Building and sampling from Bayesian model...")
+SAMPLER_SETTINGS = {"draws": 2000, "tune": 1000}
+RANDOM_SEED = 42
 
+def build_model(group_a, group_b):
     with pm.Model() as model:
         mu_a = pm.Normal("mu_a", mu=group_a.mean(), sigma=10)
         mu_b = pm.Normal("mu_b", mu=group_b.mean(), sigma=10)
@@ -51,7 +64,80 @@ def run_model(group_a, group_b):
 
         diff = pm.Deterministic("diff", mu_b - mu_a)
 
-        trace = pm.sample(2000, tune=1000, return_inferencedata=True, random_seed=42)
+    return model
+
+def normal_loglik(mu, sigma, stats: NormalStats):
+    # Normal log-likelihood of a whole group from (n, mean, m2): O(1) per gradient evaluation
+    return (
+        -0.5 * stats.n * np.log(2 * np.pi)
+        - stats.n * pm.math.log(sigma)
+        - (stats.m2 + stats.n * (stats.mean - mu) ** 2) / (2 * sigma ** 2)
+    )
+
+def build_sufficient_model(stats_a: NormalStats, stats_b: NormalStats):
+    # Same priors and posterior as build_model, but the data enter only through n, mean and m2
+    with pm.Model() as model:
+        mu_a = pm.Normal("mu_a", mu=stats_a.mean, sigma=10)
+        mu_b = pm.Normal("mu_b", mu=stats_b.mean, sigma=10)
+        sigma_a = pm.HalfNormal("sigma_a", sigma=10)
+        sigma_b = pm.HalfNormal("sigma_b", sigma=10)
+
+        pm.Potential("loglik_a", normal_loglik(mu_a, sigma_a, stats_a))
+        pm.Potential("loglik_b", normal_loglik(mu_b, sigma_b, stats_b))
+
+        diff = pm.Deterministic("diff", mu_b - mu_a)
+
+    return model
+
+def analytic_posterior(stats_a: NormalStats, stats_b: NormalStats):
+    # Normal-Inverse-Gamma conjugate posterior, drawn directly: no sampler, no O(n) work
+    post_a = weak_prior(stats_a.mean).update(stats_a)
+    post_b = weak_prior(stats_b.mean).update(stats_b)
+    draws = conjugate_ab_draws(post_a, post_b, chains=SAMPLER_CHAINS, draws=SAMPLER_SETTINGS["draws"], seed=RANDOM_SEED)
+    return az.from_dict(posterior=draws)
+
+def sample_model(model, arrays, model_source):
+    def sample(**backend_kwargs):
+        # Reuse the stored trace when data, model, settings and seed are unchanged. Keyed on
+        # the backend actually sampling, so a fallback run is stored as a PyMC trace.
+        def draw():
+            with model:
+                return pm.sample(**SAMPLER_SETTINGS, **backend_kwargs, return_inferencedata=True, random_seed=RANDOM_SEED)
+
+        return cached_sample(
+            draw,
+            arrays=arrays,
+            model=model_source,
+            sampler={
+                **SAMPLER_SETTINGS,
+                "chains": SAMPLER_CHAINS,
+                "nuts_sampler": backend_kwargs.get("nuts_sampler", "pymc"),
+            },
+            seed=RANDOM_SEED,
+        )
+
+    logger.info(f"Sampler backend: {SAMPLER_BACKEND} ({SAMPLER_CHAINS} chains)")
+    return sample_with_fallback(sample, SAMPLER_BACKEND, SAMPLER_CHAINS)
+
+
+def run_model(group_a, group_b, likelihood="full"):
+    """likelihood: 'full' (every observation), 'sufficient' (n/mean/m2 per group) or 'analytic' (conjugate)."""
+    if likelihood == "analytic":
+        logger.info("Computing conjugate (Normal-Inverse-Gamma) posterior...")
+        trace = analytic_posterior(NormalStats.from_array(group_a), NormalStats.from_array(group_b))
+    elif likelihood == "sufficient":
+        logger.info("Building and sampling from sufficient-statistics model...")
+        stats_a, stats_b = NormalStats.from_array(group_a), NormalStats.from_array(group_b)
+        model = build_sufficient_model(stats_a, stats_b)
+        trace = sample_model(
+            model,
+            {"stats_a": np.array(stats_a), "stats_b": np.array(stats_b)},
+            inspect.getsource(build_sufficient_model) + inspect.getsource(normal_loglik),
+        )
+    else:
+        logger.info("Building and sampling from Bayesian model...")
+        model = build_model(group_a, group_b)
+        trace = sample_model(model, {"group_a": group_a, "group_b": group_b}, inspect.getsource(build_model))
 
     logger.info("Sampling complete.")
     return trace
@@ -62,16 +148,29 @@ def summarize_and_plot(trace):
     print("\n🧾 Posterior Summary:\n", summary)
 
     logger.info("Plotting and saving posterior difference...")
-    az.plot_posterior(trace, var_names=["diff"], ref_val=0, hdi_prob=0.95)
-    plt.title("Posterior of μ_B - μ_A (Is Group B spending more?)")
-    plt.tight_layout()
-    plt.savefig("posterior_difference.png", dpi=300, bbox_inches="tight")
-    plt.show()
+    with stage("plot"):
+        az.plot_posterior(trace, var_names=["diff"], ref_val=0, hdi_prob=0.95)
+        plt.title("Posterior of μ_B - μ_A (Is Group B spending more?)")
+        plt.tight_layout()
+        plt.savefig("posterior_difference.png", dpi=300, bbox_inches="tight")
+    # Only open a window on an interactive backend; headless runs (and cli.py) use Agg
+    if plt.get_backend().lower() != "agg":
+        plt.show()
     logger.info("Plot saved as 'posterior_difference.png'.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bayesian A/B test of spending, low vs high income.")
+    parser.add_argument(
+        "--likelihood", choices=["full", "sufficient", "analytic"], default="full",
+        help="full: per-observation likelihood; sufficient: n/mean/m2 per group; analytic: conjugate posterior, no MCMC"
+    )
+    args = parser.parse_args()
+
     logger.info("🚀 Starting Bayesian A/B test for consumer spending...")
-    df = pd.read_csv("data/consumer_spending.csv").sample(frac=1, random_state=42)
+    df = read_csv_cached(
+        "data/consumer_spending.csv",
+        columns=["total_annual_spending", "spending_class", "income_range_code"]
+    ).sample(frac=1, random_state=42)
     group_a, group_b = clean_and_split(df)
-    trace = run_model(group_a, group_b)
+    trace = run_model(group_a, group_b, likelihood=args.likelihood)
     summarize_and_plot(trace)
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Batched Bayesian optimization for bayesian_logistic_search.py --mode batched.
+
+Each iteration asks a skopt Optimizer for --batch-size points (constant liar) and fits every
+point x fold of the batch concurrently. The preprocessor is fitted once per fold, so candidates
+only refit the classifier, and each fit starts from the coefficients of the nearest point seen
+so far. Evaluated points go to the search_runner store. A rerun replays them into the optimizer
+rather than refitting, so --n-iter 40 after a 20-point run costs 20 new points.
+
+    result = run_bayes_search("logreg", pipeline, {"clf__C": (1e-3, 100.0, "log-uniform")}, X, y, n_iter=20)
+"""
+import time
+import datetime
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+from skopt import Optimizer
+from skopt.space import check_dimension
+from instrument import instrumented
+from search_runner import ResultStore, SearchResult, data_fingerprint, estimator_fingerprint, evaluation_key
+
+DEFAULT_BATCH_SIZE = 4
+LIAR_STRATEGY = "cl_min"  # pending points are assumed to score as well as the best seen so far
+N_INITIAL_POINTS = 10  # as in BayesSearchCV
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def make_optimizer(space, random_state=42) -> Optimizer:
+    """Optimizer over `space` with dimensions in sorted name order, as BayesSearchCV builds it."""
+    dimensions = []
+    for name in sorted(space):
+        dimension = check_dimension(space[name])
+        dimension.name = name
+        dimensions.append(dimension)
+    return Optimizer(dimensions, base_estimator="GP", n_initial_points=N_INITIAL_POINTS, random_state=random_state)
+
+
+def prepare_folds(pipeline, X, y, cv) -> list:
+    """Per fold: (X_train, y_train, X_valid, y_valid) transformed by that fold's fitted preprocessor."""
+    folds = []
+    for train, valid in StratifiedKFold(cv).split(X, y):
+        prep = clone(pipeline[:-1]).fit(X.iloc[train], y.iloc[train])
+        folds.append((prep.transform(X.iloc[train]), y.iloc[train].to_numpy(),
+                      prep.transform(X.iloc[valid]), y.iloc[valid].to_numpy()))
+    return folds
+
+
+def _fit_fold(estimator, params, fold, init):
+    X_train, y_train, X_valid, y_valid = fold
+    model = clone(estimator).set_params(**params)
+    if init is not None:
+        model.set_params(warm_start=True)
+        model.coef_, model.intercept_ = np.asarray(init["coef"]), np.asarray(init["intercept"])
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    solution = {"coef": model.coef_.tolist(), "intercept": model.intercept_.tolist()}
+    return model.score(X_valid, y_valid), solution, int(np.max(model.n_iter_)), time.perf_counter() - start
+
+
+def _nearest(optimizer, x, history):
+    """Record of the evaluated point closest to x, or None before the first evaluation."""
+    if not history:
+        return None
+    points = optimizer.space.transform([h[0] for h in history])
+    distance = np.linalg.norm(points - optimizer.space.transform([x]), axis=1)
+    return history[int(np.argmin(distance))][1]
+
+
+@instrumented("search_fit", rows=None)
+def run_bayes_search(name, pipeline, space, X, y, n_iter=20, batch_size=DEFAULT_BATCH_SIZE, cv=5,
+                     n_jobs=-1, random_state=42, warm_start=True, store=None) -> SearchResult:
+    """
+    Bayesian optimization of the final pipeline step, n_iter points in total including those
+    already in `store`. Only parameters of the final step can be searched.
+    """
+    step = pipeline.steps[-1][0]
+    foreign = [p for p in space if not p.startswith(f"{step}__")]
+    if foreign:
+        raise ValueError(f"Only {step}__ parameters can be searched with the shared preprocessor, not {foreign}")
+    warm_start = warm_start and "warm_start" in pipeline[-1].get_params()
+
+    store = store if store is not None else ResultStore()
+    names = sorted(space)
+    # The pipeline's fixed settings and the sklearn version are part of the id, so a changed model never resumes old points
+    search_id = evaluation_key(name, {k: str(v) for k, v in space.items()}, ["ask_tell", random_state], cv,
+                               data_fingerprint(X, y), estimator_fingerprint(pipeline))
+    optimizer = make_optimizer(space, random_state)
+
+    # Resume: the optimizer state is its observations, replayed from the store
+    history = []
+    past = [r for r in store.records.values() if r.get("search") == search_id]
+    if past:
+        xs = [[r["params"][n] for n in names] for r in past]
+        optimizer.tell(xs, [-r["score"] for r in past])
+        history = list(zip(xs, past))
+
+    folds = prepare_folds(pipeline, X, y, cv) if len(history) < n_iter else []
+    start = time.perf_counter()
+    # Replayed points are charged their stored fit time, in store order
+    reused_seconds = 0.0
+    finished, evaluated = {}, 0
+    for i, (_, record) in enumerate(history):
+        reused_seconds += record.get("fit_seconds", 0.0)
+        finished[i] = reused_seconds
+    with Parallel(n_jobs=n_jobs) as parallel:
+        while len(history) < n_iter:
+            xs = [[_plain(v) for v in x] for x in optimizer.ask(n_points=min(batch_size, n_iter - len(history)), strategy=LIAR_STRATEGY)]
+            inits = [_nearest(optimizer, x, history) if warm_start else None for x in xs]
+            tasks = [
+                delayed(_fit_fold)(pipeline[-1], {n.split("__", 1)[1]: v for n, v in zip(names, x)}, folds[f],
+                                   init["folds"][f] if init else None)
+                for x, init in zip(xs, inits) for f in range(cv)
+            ]
+            fits = parallel(tasks)
+
+            scores = []
+            for i, x in enumerate(xs):
+                rows = fits[i * cv:(i + 1) * cv]
+                record = {
+                    "key": evaluation_key(name, dict(zip(names, x)), ["ask_tell", len(history)], cv, search_id),
+                    "search": search_id, "name": name, "params": dict(zip(names, x)),
+                    "score": float(np.mean([r[0] for r in rows])),
+                    "folds": [r[1] for r in rows],
+                    "epochs": sum(r[2] for r in rows), "warm_started": inits[i] is not None,
+                    "fit_seconds": round(sum(r[3] for r in rows), 3),
+                    "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                }
+                store.put(record)
+                history.append((x, record))
+                finished[len(history) - 1] = time.perf_counter() - start + reused_seconds
+                scores.append(-record["score"])
+                evaluated += 1
+            optimizer.tell(xs, scores)
+
+    best_index = max(range(len(history)), key=lambda i: history[i][1]["score"])
+    best = history[best_index][1]
+    time_to_best = finished[best_index]
+    label = f"ask_tell[batch={batch_size}]"
+    return SearchResult(label, best["params"], best["score"], time_to_best, time.perf_counter() - start, evaluated, len(past),
+                        reused_seconds)
+
+
+def epoch_summary(store, result_name) -> dict:
+    """Mean solver epochs per fold fit, cold vs warm-started, over a search's records."""
+    records = [r for r in store.records.values() if r.get("name") == result_name and "epochs" in r]
+    summary = {}
+    for warm in (False, True):
+        fits = [r["epochs"] / len(r["folds"]) for r in records if r["warm_started"] == warm]
+        if fits:
+            summary["warm" if warm else "cold"] = round(float(np.mean(fits)), 1)
+    return summary
@@ -1,28 +1,120 @@
-import pandas as pd
+import os
+import time
+import inspect
+import argparse
+from sampler_backend import configure_pytensor, enable_jax_cpu_devices, sample_with_fallback
+
+# Pick the sampler backend before PyTensor is imported (see ab_test_bayesian_spending.py)
+SAMPLER_BACKEND = configure_pytensor(os.environ.get("SAMPLER_BACKEND", "auto"))
+SAMPLER_CHAINS = int(os.environ.get("SAMPLER_CHAINS", "2"))
+enable_jax_cpu_devices(SAMPLER_CHAINS)
+
 import bambi as bmb
+import arviz as az
 import matplotlib.pyplot as plt
+from columnar_cache import read_csv_cached
+from trace_cache import cached_sample
+from instrument import stage
+from variational import VI_METHODS, DEFAULT_VI_STEPS, design_model, fit_vi, compare_to_reference
+
+FORMULA = "spending_class ~ age_of_reference_person + education_level + region_code + income_range_code"
+# Memoized on the modelling data, formula/family/priors and sampler settings
+FIT_SETTINGS = {"draws": 1000, "tune": 1000}
+RANDOM_SEED = 42
+
+
+def parse_args(argv=None):
+    # --- Inference options: NUTS (default, for audits) or a variational fast path (daily scoring)
+    parser = argparse.ArgumentParser(description="Bayesian categorical model of spending_class.")
+    parser.add_argument("--inference", choices=["nuts", *VI_METHODS], default="nuts")
+    parser.add_argument("--vi-steps", type=int, default=DEFAULT_VI_STEPS, help="ADVI optimization steps")
+    parser.add_argument("--batch-size", type=int, help="Minibatch ADVI with this many rows per step")
+    parser.add_argument("--compare", action="store_true", help="Report VI accuracy against the NUTS reference fit")
+    args = parser.parse_args(argv)
+    if args.inference == "nuts" and args.batch_size:
+        parser.error("--batch-size only applies to variational inference; NUTS always uses every row")
+    if args.inference == "nuts" and args.compare:
+        parser.error("--compare measures a variational fit against NUTS; pick --inference advi, fullrank_advi or pathfinder")
+    return args
+
+
+def load_data(path="data/consumer_spending.csv"):
+    # Load and selectively clean
+    df = read_csv_cached(path, columns=[
+        "age_of_reference_person", "education_level", "region_code", "income_range_code", "spending_class"
+    ])
+
+    # Drop only rows missing modeling inputs
+    df = df.dropna(subset=["age_of_reference_person", "region_code", "income_range_code", "spending_class"])
+    df["education_level"] = df["education_level"].fillna("Missing")
+    return df
+
+
+def fit_nuts(model, df):
+    def fit(**backend_kwargs):
+        # Keyed on the backend actually sampling, so a fallback run is stored as a PyMC trace
+        return cached_sample(
+            lambda: model.fit(**FIT_SETTINGS, **backend_kwargs, random_seed=RANDOM_SEED),
+            arrays={"df": df},
+            model=str(model),
+            sampler={
+                **FIT_SETTINGS,
+                "chains": SAMPLER_CHAINS,
+                "nuts_sampler": backend_kwargs.get("nuts_sampler", "pymc"),
+            },
+            seed=RANDOM_SEED,
+        )
+
+    print(f"⚙️ Sampler backend: {SAMPLER_BACKEND} ({SAMPLER_CHAINS} chains)")
+    return sample_with_fallback(fit, SAMPLER_BACKEND, SAMPLER_CHAINS)
+
+
+def fit_variational(model, df, inference, steps, batch_size=None):
+    vi_settings = {"inference": inference, "steps": steps, "batch_size": batch_size, "draws": 1000}
+    return cached_sample(
+        lambda: fit_vi(model, inference, steps, batch_size=batch_size, random_seed=RANDOM_SEED),
+        arrays={"df": df},
+        model=str(model) + inspect.getsource(design_model) + inspect.getsource(fit_vi),
+        sampler=vi_settings,
+        seed=RANDOM_SEED,
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    df = load_data()
+
+    # Optional: view class distribution
+    print(df["spending_class"].value_counts())
 
-# Load and selectively clean
-df = pd.read_csv("data/consumer_spending.csv")
+    # Fit Bayesian categorical model
+    model = bmb.Model(FORMULA, df, family="categorical")
 
-# Drop only rows missing modeling inputs
-df = df.dropna(subset=["age_of_reference_person", "region_code", "income_range_code", "spending_class"])
-df["education_level"] = df["education_level"].fillna("Missing")
+    start = time.perf_counter()
+    if args.inference == "nuts":
+        fitted = fit_nuts(model, df)
+    else:
+        fitted = fit_variational(model, df, args.inference, args.vi_steps, args.batch_size)
+    print(f"✅ Model fit complete ({args.inference}, {time.perf_counter() - start:.1f}s).")
 
-# Optional: view class distribution
-print(df["spending_class"].value_counts())
+    if args.compare:
+        accuracy = compare_to_reference(fitted, fit_nuts(model, df))
+        print(f"\n🎯 {args.inference} vs NUTS (mean shift in NUTS sds, sd ratio):\n", accuracy.round(3))
+        print(
+            f"\nMax mean shift: {accuracy['mean_shift'].max():.3f} sd | "
+            f"sd ratio range: {accuracy['sd_ratio'].min():.2f}-{accuracy['sd_ratio'].max():.2f}"
+        )
 
-# Fit Bayesian categorical model
-model = bmb.Model(
-    "spending_class ~ age_of_reference_person + education_level + region_code + income_range_code",
-    df,
-    family="categorical"
-)
+    # Visualize posterior means (Bambi models have no .plot(); forest plot of every coefficient)
+    with stage("plot"):
+        az.plot_forest(fitted, combined=True, hdi_prob=0.95)
+        plt.tight_layout()
+        plt.savefig("posterior_means.png", dpi=300, bbox_inches="tight")
+    print("📈 Plot saved as 'posterior_means.png'.")
+    # Only open a window on an interactive backend; headless runs (and cli.py) use Agg
+    if plt.get_backend().lower() != "agg":
+        plt.show()
 
-fitted = model.fit(draws=1000, tune=1000, chains=2)
-print("✅ Model fit complete.")
 
-# Visualize posterior means
-model.plot(fitted)
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
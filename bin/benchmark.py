@@ -0,0 +1,377 @@
+"""
+Benchmark the pipeline stages, the search scripts and the PyMC models, and catch regressions.
+
+Every stage runs in a fresh subprocess and reports wall and CPU seconds, peak RSS of the timed
+region and rows/s, plus ESS/s for the models. Scale 1 is the bundled data. Scale k tiles those
+files k times with offset NEWIDs, or with --synthetic builds the workspace from a synthetic.py
+profile. Search and model stages only run at --model-scales (default 1). Results are JSON.
+--baseline compares against an earlier run and exits 1 when a stage is slower than --tolerance.
+
+Usage:
+    python bin/benchmark.py --output benchmarks.json
+    python bin/benchmark.py --scales 1 10 100 --stages ingest aggregate merge preprocess
+    python bin/benchmark.py --baseline benchmarks.json --tolerance 0.2
+    python bin/benchmark.py --synthetic .cache/synthetic/profile.json --scales 1 10 --stages ingest aggregate merge
+"""
+import os
+import sys
+import ast
+import json
+import glob
+import shutil
+import argparse
+import platform
+import resource
+import datetime
+import importlib
+import subprocess
+import tempfile
+from instrument import clock, peak_rss_mb, reset_peak
+
+BIN_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(BIN_DIR, ".."))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+WORK_DIR = os.path.join(BASE_DIR, ".cache", "benchmark")
+SOURCE_DIR = "intrvw23"
+SPENDING_CSV = "consumer_spending.csv"
+ID_COLUMNS = ("NEWID", "consumer_unit_id")
+ID_OFFSET = 10 ** 8
+
+DATA_STAGES = ("ingest", "aggregate", "merge", "preprocess")
+SCRIPT_STAGES = {
+    "search_grid": ("grid_search_model.py", ["--no-store"]),
+    "search_random": ("random_search_model.py", ["--no-store"]),
+    "search_bayes": ("bayesian_logistic_search.py", []),
+    "model_regression": ("spending_vs_income_range_code.py", []),
+    "model_categorical": ("bayesian_pymc_model.py", []),
+}
+MODEL_STAGES = ("model_ab_test", "model_regression", "model_categorical")
+STAGES = DATA_STAGES + ("search_grid", "search_random", "search_bayes") + MODEL_STAGES
+
+
+# --- Scaled workspaces ---
+def _source_files():
+    return sorted(glob.glob(os.path.join(DATA_DIR, SOURCE_DIR, "**", "*.csv"), recursive=True)) + [
+        os.path.join(DATA_DIR, SPENDING_CSV)
+    ]
+
+
+def _tile_csv(src, dst, scale):
+    import pandas as pd
+
+    df = pd.read_csv(src, dtype=str, keep_default_na=False)
+    id_col = next((c for c in ID_COLUMNS if c in df.columns), None)
+    ids = pd.to_numeric(df[id_col]) if id_col else None
+    width = df[id_col].str.len().max() if id_col else 0
+    for copy in range(scale):
+        if id_col:
+            df[id_col] = (ids + copy * ID_OFFSET).astype(str).str.zfill(width)
+        df.to_csv(dst, mode="w" if copy == 0 else "a", header=copy == 0, index=False)
+
+
+def workspace(scale) -> str:
+    """Directory whose data/ holds the bundled inputs at `scale` (the repo itself for scale 1)."""
+    if scale == 1:
+        return BASE_DIR
+    root = os.path.join(WORK_DIR, f"scale_{scale}")
+    marker = os.path.join(root, "complete.json")
+    sources = {os.path.relpath(p, DATA_DIR): [os.path.getsize(p), os.stat(p).st_mtime_ns] for p in _source_files()}
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if json.load(f) == sources:
+                return root
+
+    print(f"🧱 Building {scale}x workspace under {root} ...", file=sys.stderr)
+    shutil.rmtree(root, ignore_errors=True)
+    for rel in sources:
+        dst = os.path.join(root, "data", rel)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        _tile_csv(os.path.join(DATA_DIR, rel), dst, scale)
+    with open(marker, "w") as f:
+        json.dump(sources, f)
+    return root
+
+
+def synthetic_workspace(scale, profile_path) -> str:
+    """Like workspace(), but data/ is generated by synthetic.py from a fitted profile at `scale` x its units."""
+    import synthetic
+
+    root = os.path.join(WORK_DIR, f"synthetic_{scale}")
+    marker = os.path.join(root, "complete.json")
+    stamp = {"profile": os.path.abspath(profile_path), "mtime_ns": os.stat(profile_path).st_mtime_ns, "scale": scale}
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if json.load(f) == stamp:
+                return root
+
+    print(f"🧪 Generating synthetic {scale}x workspace under {root} ...", file=sys.stderr)
+    shutil.rmtree(root, ignore_errors=True)
+    profile = synthetic.load_profile(profile_path)
+    units = int(round(profile["units"] * scale))
+    release = [name for name in profile["files"] if name != SPENDING_CSV]
+    synthetic.generate(profile, units, os.path.join(root, "data", SOURCE_DIR), files=release)
+    if SPENDING_CSV in profile["files"]:
+        synthetic.generate(profile, units, os.path.join(root, "data"), files=[SPENDING_CSV])
+    else:
+        _tile_csv(os.path.join(DATA_DIR, SPENDING_CSV), os.path.join(root, "data", SPENDING_CSV), scale)
+    with open(marker, "w") as f:
+        json.dump(stamp, f)
+    return root
+
+
+# --- Stages (run inside the worker subprocess, cwd = workspace) ---
+def _csv_files():
+    return sorted(glob.glob(os.path.join("data", SOURCE_DIR, "**", "*.csv"), recursive=True))
+
+
+def _workload_column(columns):
+    """
+    Amount column to aggregate: a known spending column, else the first CE dollar variable
+    (names ending in X). The bundled files carry no FMLI/MTBI, so this is a representative workload.
+    """
+    import ingest
+
+    return ingest.find_amount_column(columns) or next((c for c in columns if c.endswith("X")), None)
+
+
+def _aggregate_all():
+    import ingest
+
+    totals = {}
+    for path in _csv_files():
+        columns = ingest.read_header(path)
+        col = _workload_column(columns)
+        if col and "NEWID" in columns:
+            totals[f"spending_{os.path.splitext(os.path.basename(path))[0]}"] = ingest.aggregate_spending(path, col)
+    return totals
+
+
+def _min_ess(trace):
+    import arviz as az
+
+    posterior = trace.posterior
+    small = [v for v in posterior.data_vars if posterior[v].size <= 200 * posterior.sizes["chain"] * posterior.sizes["draw"]]
+    return float(az.ess(trace, var_names=small).to_array().min())
+
+
+def _load_script(stage):
+    """
+    Compile a bin/ script and import the modules it imports at top level, so the timed
+    region doesn't pay for loading pymc, sklearn and friends.
+    """
+    script, argv = SCRIPT_STAGES[stage]
+    path = os.path.join(BIN_DIR, script)
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                importlib.import_module(alias.name)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            importlib.import_module(node.module)
+    return path, argv, compile(tree, path, "exec")
+
+
+def _run_script(path, argv, code):
+    """Execute a compiled bin/ script as __main__ and return its globals, even if it fails after fitting."""
+    sys.argv = [path, *argv]
+    namespace = {"__name__": "__main__", "__file__": path}
+    error = None
+    try:
+        exec(code, namespace)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return namespace, error
+
+
+def _start(result):
+    """Begin the timed region: reset the RSS high-water mark so peak RSS leaves out imports and setup."""
+    result["peak_rss_scope"] = "stage" if reset_peak() else "process"
+    return clock()
+
+
+def run_stage(stage):
+    """Run one stage and return its measurements; setup that isn't part of the stage stays untimed."""
+    import pandas as pd
+
+    result = {}
+    if stage == "ingest":
+        start = _start(result)
+        result["rows"] = sum(len(pd.read_csv(p, low_memory=False)) for p in _csv_files())
+    elif stage == "aggregate":
+        start = _start(result)
+        totals = _aggregate_all()
+        result["rows"] = int(sum(len(t) for t in totals.values()))
+    elif stage == "merge":
+        import ingest
+
+        totals = _aggregate_all()
+        start = _start(result)
+        result["rows"] = len(ingest.pivot_by_quarter(totals))
+    elif stage == "preprocess":
+        from data_preprocessing import load_and_split, make_preprocessor
+
+        X_train, _, _, _ = load_and_split(os.path.join("data", SPENDING_CSV))
+        start = _start(result)
+        make_preprocessor().fit_transform(X_train)
+        result["rows"] = len(X_train)
+    elif stage == "model_ab_test":
+        import ab_test_bayesian_spending as ab
+
+        df = pd.read_csv(os.path.join("data", SPENDING_CSV)).sample(frac=1, random_state=42)
+        group_a, group_b = ab.clean_and_split(df)
+        start = _start(result)
+        trace = ab.run_model(group_a, group_b)
+        result["rows"] = len(group_a) + len(group_b)
+        result["min_ess_bulk"] = _min_ess(trace)
+    else:
+        script = _load_script(stage)
+        start = _start(result)
+        namespace, error = _run_script(*script)
+        trace = namespace.get("trace", namespace.get("fitted"))
+        if stage.startswith("model_") and trace is not None:
+            result["min_ess_bulk"] = _min_ess(trace)
+        elif error:
+            raise RuntimeError(error)
+        if error:
+            result["error"] = error
+
+    end = clock()
+    result["peak_rss_mb"] = peak_rss_mb()
+    # Largest finished child (e.g. a joblib / process-pool worker); live workers aren't counted
+    result["peak_rss_children_mb"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    result["wall_seconds"] = end[0] - start[0]
+    result["cpu_seconds"] = end[1] - start[1]
+    return result
+
+
+def worker(stage, scale, result_file):
+    sys.path.insert(0, BIN_DIR)
+    try:
+        result = run_stage(stage)
+    except Exception as e:
+        result = {"skipped": f"{type(e).__name__}: {e}"}
+    result.update({"stage": stage, "scale": scale})
+    result.setdefault("peak_rss_mb", peak_rss_mb())
+    if "wall_seconds" in result:
+        if result.get("rows"):
+            result["rows_per_second"] = result["rows"] / result["wall_seconds"]
+        if "min_ess_bulk" in result:
+            result["ess_per_second"] = result["min_ess_bulk"] / result["wall_seconds"]
+    with open(result_file, "w") as f:
+        json.dump(result, f)
+
+
+# --- Driver ---
+def run_benchmarks(stages, scales, model_scales=(1,), synthetic_profile=None):
+    results = []
+    for scale in scales:
+        root = synthetic_workspace(scale, synthetic_profile) if synthetic_profile else workspace(scale)
+        for stage in stages:
+            if stage not in DATA_STAGES and scale not in model_scales:
+                continue
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+                result_file = tmp.name
+            # Same read path at every scale (no Parquet mirror), and no instrument stages
+            # resetting the peak RSS underneath the worker's measurement
+            env = {
+                **{k: v for k, v in os.environ.items() if not k.startswith("INSTRUMENT_")},
+                "MPLBACKEND": "Agg",
+                "TRACE_CACHE": "0",
+                "COLUMNAR_CACHE": "0",
+                "PYTHONPATH": os.pathsep.join(filter(None, [BIN_DIR, os.environ.get("PYTHONPATH")])),
+                # Keep the benchmark's fits away from the real scoring model
+                "SCORING_MODEL_PATH": os.path.join(WORK_DIR, "models", "spending_vs_income.nc"),
+            }
+            cmd = [sys.executable, os.path.abspath(__file__), "--worker", stage, "--scale", str(scale), "--result-file", result_file]
+            proc = subprocess.run(cmd, cwd=root, env=env, capture_output=True, text=True)
+            try:
+                with open(result_file) as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                result = {"stage": stage, "scale": scale, "skipped": f"worker exited {proc.returncode}: {proc.stderr[-500:]}"}
+            finally:
+                if os.path.exists(result_file):
+                    os.remove(result_file)
+            results.append(result)
+            status = result.get("skipped") or f"{result['wall_seconds']:.2f}s"
+            print(f"  {stage:<18} {scale:>5}x  {status}", file=sys.stderr)
+    return results
+
+
+def metadata():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        rev = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_rev": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance=0.2, min_seconds=0.05) -> list:
+    """One row per stage/scale present in both runs; regression = wall time up by more than tolerance."""
+    previous = {(r["stage"], r["scale"]): r for r in baseline["results"] if "wall_seconds" in r}
+    rows = []
+    for r in results:
+        old = previous.get((r["stage"], r["scale"]))
+        if not old or "wall_seconds" not in r:
+            continue
+        ratio = r["wall_seconds"] / old["wall_seconds"]
+        regressed = ratio > 1 + tolerance and r["wall_seconds"] - old["wall_seconds"] > min_seconds
+        rows.append({"stage": r["stage"], "scale": r["scale"], "baseline_s": old["wall_seconds"],
+                     "current_s": r["wall_seconds"], "ratio": ratio, "regression": regressed})
+    return rows
+
+
+def print_results(results):
+    print(f"\n⏱️ Benchmarks:\n{'stage':<18} {'scale':>6} {'wall s':>9} {'cpu s':>9} {'RSS MB':>8} {'rows/s':>12} {'ESS/s':>8}")
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['stage']:<18} {r['scale']:>5}x  skipped: {r['skipped'][:80]}")
+            continue
+        rows = f"{r['rows_per_second']:,.0f}" if "rows_per_second" in r else "-"
+        ess = f"{r['ess_per_second']:.1f}" if "ess_per_second" in r else "-"
+        print(f"{r['stage']:<18} {r['scale']:>5}x {r['wall_seconds']:>9.3f} {r['cpu_seconds']:>9.2f} "
+              f"{r['peak_rss_mb']:>8.0f} {rows:>12} {ess:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages, searches and models.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--scales", nargs="+", type=int, default=[1], help="Data scale factors, e.g. 1 10 100 1000")
+    parser.add_argument("--model-scales", nargs="+", type=int, default=[1], help="Scales at which search/model stages run")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--synthetic", metavar="PROFILE", help="Build workspaces with synthetic.py from this profile instead of tiling")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--scale", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.scale, args.result_file)
+        raise SystemExit(0)
+
+    results = run_benchmarks(args.stages, args.scales, args.model_scales, args.synthetic)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": metadata(), "results": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows = compare(results, json.load(f), args.tolerance)
+        print(f"\n📊 Against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for row in rows:
+            flag = "❌ REGRESSION" if row["regression"] else "✅"
+            print(f"{row['stage']:<18} {row['scale']:>5}x {row['baseline_s']:>9.3f} -> {row['current_s']:>9.3f}  x{row['ratio']:.2f} {flag}")
+        if any(row["regression"] for row in rows):
+            raise SystemExit(1)
@@ -0,0 +1,93 @@
+"""
+Compare NUTS backends on the two-group A/B model from ab_test_bayesian_spending.py.
+
+Each backend runs in its own subprocess (PyTensor flags are fixed at import time),
+with the trace cache disabled. Reported per backend: wall time, minimum bulk ESS
+over mu_a/mu_b/sigma_a/sigma_b, and ESS per second.
+
+Usage:
+    python bin/benchmark_samplers.py
+    python bin/benchmark_samplers.py --backends pymc python --chains 4 --output sampler_benchmark.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+VAR_NAMES = ["mu_a", "mu_b", "sigma_a", "sigma_b"]
+
+
+def run_worker(backend, chains, data_path):
+    # Imported here so each subprocess configures PyTensor for its own backend first
+    os.environ["SAMPLER_BACKEND"] = backend
+    os.environ["SAMPLER_CHAINS"] = str(chains)
+    os.environ["TRACE_CACHE"] = "0"
+    import ab_test_bayesian_spending as ab
+    import arviz as az
+    import pymc as pm
+    from columnar_cache import read_csv_cached
+
+    df = read_csv_cached(data_path, columns=["total_annual_spending", "spending_class", "income_range_code"])
+    group_a, group_b = ab.clean_and_split(df.sample(frac=1, random_state=42))
+    model = ab.build_model(group_a, group_b)
+
+    kwargs = ab.sample_kwargs(ab.SAMPLER_BACKEND, chains)
+    start = time.perf_counter()
+    with model:
+        trace = pm.sample(**ab.SAMPLER_SETTINGS, **kwargs, random_seed=ab.RANDOM_SEED, progressbar=False)
+    wall = time.perf_counter() - start
+
+    ess = float(az.ess(trace, var_names=VAR_NAMES).to_array().min())
+    return {
+        "backend": ab.SAMPLER_BACKEND,
+        "requested": backend,
+        "chains": chains,
+        "cores": kwargs["cores"],
+        "wall_seconds": round(wall, 3),
+        "min_ess_bulk": round(ess, 1),
+        "ess_per_second": round(ess / wall, 1),
+    }
+
+
+def benchmark(backends, chains, data_path):
+    results = []
+    for backend in backends:
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", backend, "--chains", str(chains), "--data", data_path]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=BASE_DIR)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            print(f"⚠️ {backend} failed:\n{proc.stderr[-2000:]}", file=sys.stderr)
+            continue
+        results.append(json.loads(lines[-1]))
+    return results
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from sampler_backend import available_backends
+
+    parser = argparse.ArgumentParser(description="Wall time and ESS/sec across NUTS backends.")
+    parser.add_argument("--backends", nargs="+", default=None, help="Default: every backend available here")
+    parser.add_argument("--chains", type=int, default=4)
+    parser.add_argument("--data", default=os.path.join(BASE_DIR, "data", "consumer_spending.csv"))
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.chains, args.data)))
+        raise SystemExit(0)
+
+    results = benchmark(args.backends or available_backends(), args.chains, args.data)
+    print(f"\n⏱️ Sampler benchmark ({args.chains} chains):")
+    print(f"{'backend':<10} {'cores':>5} {'wall s':>8} {'min ESS':>9} {'ESS/s':>9}")
+    for r in sorted(results, key=lambda r: -r["ess_per_second"]):
+        print(f"{r['backend']:<10} {r['cores']:>5} {r['wall_seconds']:>8.2f} {r['min_ess_bulk']:>9.0f} {r['ess_per_second']:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📄 Results written to {args.output}")
@@ -0,0 +1,85 @@
+"""
+Single entry point for the bin/ scripts.
+
+Each subcommand runs its script as __main__, so a command only imports what its script needs.
+The z-test never loads pymc or sklearn. Plots use the Agg backend unless --show is given, so
+nothing blocks in a headless run. PyTensor compiles into the shared cache under .cache/pytensor.
+
+Usage:
+    python bin/cli.py                                   # list commands
+    python bin/cli.py ztest --by region_code
+    python bin/cli.py --instrument events.jsonl ab-test --likelihood sufficient
+    python bin/cli.py --show pymc-model --inference advi
+"""
+import os
+import sys
+import runpy
+import argparse
+
+BIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# command -> (script, one-line summary)
+COMMANDS = {
+    "generate": ("generate.py", "Build data/consumer_spending.csv from the CE PUMD ZIP (or --years partitions)"),
+    "generate-legacy": ("generate_consumer_spending_dataset.py", "Build the dataset from the first usable EXPN file"),
+    "fetch": ("fetch.py", "Download or mirror the PUMD ZIP with resume and checksum"),
+    "cache": ("columnar_cache.py", "Build the Parquet mirror of the extracted CSVs"),
+    "scan": ("scan_column_index.py", "Index the extracted CSVs into column_index_report.csv"),
+    "synthetic": ("synthetic.py", "Fit a synthetic-data profile or generate CE-like data at any scale"),
+    "ztest": ("ztest_compare_high_income_to_population_avg.py", "z-test, or batched frequentist tests across segments"),
+    "ab-test": ("ab_test_bayesian_spending.py", "Bayesian A/B test of spending, low vs high income"),
+    "ab-segments": ("ab_segments.py", "Bayesian A/B tests across many segments in one model"),
+    "online-update": ("online_update.py", "Incremental Bayesian updates from new data"),
+    "spending-vs-income": ("spending_vs_income_range_code.py", "Bayesian regression of spending on income range"),
+    "score": ("scoring.py", "Posterior-predictive scoring with the spending-vs-income model"),
+    "pymc-model": ("bayesian_pymc_model.py", "Bambi categorical model of spending class (NUTS or VI)"),
+    "grid-search": ("grid_search_model.py", "Decision tree grid search"),
+    "random-search": ("random_search_model.py", "Random forest random / halving search"),
+    "bayes-search": ("bayesian_logistic_search.py", "Bayesian optimization of the L1 logistic regression"),
+    "benchmark": ("benchmark.py", "Benchmark suite with baseline regression checks"),
+    "benchmark-samplers": ("benchmark_samplers.py", "Compare NUTS backends on the A/B model"),
+    "instrument": ("instrument.py", "Summarize an instrumentation event log"),
+}
+
+
+def parse_args(argv=None):
+    width = max(len(c) for c in COMMANDS)
+    listing = "\n".join(f"  {c:<{width}}  {summary}" for c, (_, summary) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Run a bin/ script as a subcommand; arguments after the command go to the script.",
+        epilog=f"commands:\n{listing}",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--show", action="store_true", help="Use the interactive matplotlib backend and show plots")
+    parser.add_argument("--instrument", metavar="LOG", help="Append stage events to LOG (see instrument.py)")
+    parser.add_argument("command", nargs="?", choices=COMMANDS, metavar="command")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the command's script")
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        raise SystemExit(0)
+    return args
+
+
+def run(command, argv, show=False, instrument=None):
+    """Run `command`'s script as __main__ with argv, after setting up backend, caches and instrumentation."""
+    script = os.path.join(BIN_DIR, COMMANDS[command][0])
+    if not show:
+        os.environ.setdefault("MPLBACKEND", "Agg")
+    if instrument:
+        os.environ["INSTRUMENT_LOG"] = instrument
+
+    # Sibling imports resolve from bin/, and PYTENSOR_FLAGS must be set before anything imports pytensor
+    if BIN_DIR not in sys.path:
+        sys.path.insert(0, BIN_DIR)
+    from sampler_backend import configure_pytensor
+
+    configure_pytensor(os.environ.get("SAMPLER_BACKEND", "auto"))
+    sys.argv = [script, *argv]
+    runpy.run_path(script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.command, args.args, show=args.show, instrument=args.instrument)
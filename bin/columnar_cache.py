@@ -0,0 +1,221 @@
+"""
+Parquet mirror of the CSVs under data/, e.g. data/intrvw23/expn23/apa23.csv ->
+data/columnar/intrvw23/expn23/apa23.parquet.
+
+A sidecar .meta.json records the source's size, mtime and sha256. A mirror is rebuilt only when
+the source really changed: a re-extracted but identical CSV just gets its sidecar refreshed.
+Without pyarrow, or with COLUMNAR_CACHE=0, reads fall back to pandas.read_csv.
+
+Usage:
+    python bin/columnar_cache.py            # mirror data/intrvw23
+    python bin/columnar_cache.py --force    # rebuild everything
+"""
+import os
+import json
+import glob
+import fnmatch
+import hashlib
+import logging
+import argparse
+import pandas as pd
+from instrument import instrumented
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+CACHE_DIR = os.path.join(DATA_DIR, "columnar")
+HASH_BLOCK_SIZE = 1 << 20
+CONVERT_CHUNKSIZE = 250_000
+
+
+def enabled() -> bool:
+    return pq is not None and os.environ.get("COLUMNAR_CACHE", "1") not in ("0", "false", "no")
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(csv_path, data_dir=DATA_DIR, cache_dir=CACHE_DIR):
+    """Parquet location for a CSV under data_dir, or None if it lives elsewhere."""
+    rel = os.path.relpath(os.path.abspath(csv_path), data_dir)
+    if rel.startswith(os.pardir) or os.path.isabs(rel):
+        return None
+    return os.path.join(cache_dir, os.path.splitext(rel)[0] + ".parquet")
+
+
+def _meta_path(parquet_path):
+    return os.path.splitext(parquet_path)[0] + ".meta.json"
+
+
+def _read_meta(parquet_path):
+    try:
+        with open(_meta_path(parquet_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(parquet_path, meta):
+    tmp = _meta_path(parquet_path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, _meta_path(parquet_path))
+
+
+def _source_stat(csv_path):
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def fresh_cache_path(csv_path, data_dir=DATA_DIR, cache_dir=CACHE_DIR):
+    """Return the Parquet path if it matches the CSV's size and mtime, else None. Stat-only."""
+    if not enabled():
+        return None
+    target = cache_path(csv_path, data_dir, cache_dir)
+    if not target or not os.path.exists(target):
+        return None
+    meta = _read_meta(target)
+    if not meta or not os.path.exists(csv_path):
+        return None
+    stat = _source_stat(csv_path)
+    if meta.get("size") == stat["size"] and meta.get("mtime_ns") == stat["mtime_ns"]:
+        return target
+    return None
+
+
+def infer_schema(csv_path, chunksize=CONVERT_CHUNKSIZE):
+    """
+    Arrow schema pandas would infer from the whole file, found one chunk at a time.
+
+    A column is int64 if every chunk parsed as integers, float64 if every chunk was numeric,
+    and string otherwise.
+    """
+    kinds = {}
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, low_memory=False):
+        for col, dtype in chunk.dtypes.items():
+            kind = dtype.kind if dtype.kind in "if" else "O"
+            prev = kinds.get(col, kind)
+            kinds[col] = prev if prev == kind else ("f" if {prev, kind} == {"i", "f"} else "O")
+    types = {"i": pa.int64(), "f": pa.float64(), "O": pa.string()}
+    return pa.schema([(col, types[kind]) for col, kind in kinds.items()])
+
+
+def convert(csv_path, target, chunksize=CONVERT_CHUNKSIZE):
+    """
+    Write one CSV to Parquet in chunks, with the dtypes pandas would infer from the whole file.
+
+    Two passes (infer the schema, then write one row group per chunk), so memory stays at
+    about one chunk whatever the file size.
+    """
+    schema = infer_schema(csv_path, chunksize)
+    dtype = {f.name: (str if pa.types.is_string(f.type) else f.type.to_pandas_dtype()) for f in schema}
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = target + ".tmp"
+    rows = 0
+    with pq.ParquetWriter(tmp, schema) as writer:
+        for chunk in pd.read_csv(csv_path, dtype=dtype, chunksize=chunksize):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    os.replace(tmp, target)
+    return rows
+
+
+def ensure_cached(csv_path, data_dir=DATA_DIR, cache_dir=CACHE_DIR, force=False):
+    """
+    Bring the Parquet copy of csv_path up to date.
+
+    Returns (parquet_path, status) with status in {"fresh", "touched", "built"},
+    or (None, "unavailable") when the cache is disabled or the CSV is outside data_dir.
+    """
+    target = cache_path(csv_path, data_dir, cache_dir)
+    if not enabled() or target is None:
+        return None, "unavailable"
+
+    stat = _source_stat(csv_path)
+    meta = _read_meta(target) if os.path.exists(target) else None
+    if not force and meta and meta.get("size") == stat["size"]:
+        if meta.get("mtime_ns") == stat["mtime_ns"]:
+            return target, "fresh"
+        # Re-extracted with a new mtime: only rebuild if the bytes actually changed
+        sha = file_sha256(csv_path)
+        if meta.get("sha256") == sha:
+            _write_meta(target, {**meta, **stat})
+            return target, "touched"
+    else:
+        sha = file_sha256(csv_path)
+
+    rows = convert(csv_path, target)
+    _write_meta(target, {**stat, "sha256": sha, "source": os.path.relpath(csv_path, data_dir), "rows": rows})
+    return target, "built"
+
+
+def build_cache(src_dir, data_dir=DATA_DIR, cache_dir=CACHE_DIR, force=False, patterns=None):
+    """
+    Mirror the CSVs under src_dir, or only those whose path relative to src_dir matches one
+    of `patterns` (fnmatch, case-insensitive). Returns a {status: count} summary.
+    """
+    summary = {}
+    for csv_path in sorted(glob.glob(os.path.join(src_dir, "**", "*.csv"), recursive=True)):
+        rel = os.path.relpath(csv_path, src_dir).replace(os.sep, "/").lower()
+        if patterns is not None and not any(fnmatch.fnmatch(rel, p) for p in patterns):
+            continue
+        try:
+            _, status = ensure_cached(csv_path, data_dir, cache_dir, force=force)
+        except Exception as e:
+            logger.warning(f"Could not cache {os.path.basename(csv_path)}: {e}")
+            status = "failed"
+        summary[status] = summary.get(status, 0) + 1
+    return summary
+
+
+def read_schema_columns(parquet_path) -> list:
+    return pq.read_schema(parquet_path).names
+
+
+@instrumented("read_csv")
+def read_csv_cached(csv_path, columns=None, dtype=None, build=True) -> pd.DataFrame:
+    """
+    Drop-in for pd.read_csv(csv_path, usecols=columns, dtype=dtype) that reads
+    the memory-mapped Parquet mirror when one exists (building it if asked).
+    """
+    target = fresh_cache_path(csv_path)
+    if target is None and build:
+        target, _ = ensure_cached(csv_path)
+    if target is None:
+        return pd.read_csv(csv_path, usecols=columns, dtype=dtype)
+
+    df = pd.read_parquet(target, columns=list(columns) if columns else None, memory_map=True)
+    return df.astype(dtype) if dtype else df
+
+
+def iter_cached_batches(parquet_path, columns, batch_size):
+    """Yield DataFrames of `columns` from a memory-mapped Parquet file, batch_size rows at a time."""
+    pf = pq.ParquetFile(parquet_path, memory_map=True)
+    for batch in pf.iter_batches(batch_size=batch_size, columns=list(columns)):
+        yield batch.to_pandas()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="🗃️ %(levelname)s: %(message)s")
+
+    parser = argparse.ArgumentParser(description="Mirror extracted CE PUMD CSVs to Parquet.")
+    parser.add_argument("--src", default=os.path.join(DATA_DIR, "intrvw23"), help="Directory of CSVs to mirror")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the source is unchanged")
+    args = parser.parse_args()
+
+    if pq is None:
+        raise SystemExit("❌ pyarrow is not installed; the columnar cache is unavailable.")
+    summary = build_cache(args.src, force=args.force)
+    logger.info(f"📦 Columnar cache under {CACHE_DIR}: {summary}")
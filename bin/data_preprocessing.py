@@ -1,12 +1,22 @@
-import pandas as pd
+import os
+from joblib import Memory
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.impute import SimpleImputer
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
+from columnar_cache import read_csv_cached
+from instrument import instrumented
 
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PIPELINE_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "sklearn")
+PIPELINE_CACHE_MAX_BYTES = "512M"
+
+@instrumented("preprocess", rows=lambda split: len(split[0]) + len(split[1]))
 def load_and_split(path="data/consumer_spending.csv", target_col="spending_class"):
-    df = pd.read_csv(path)
+    df = read_csv_cached(path, columns=[
+        "age_of_reference_person", "education_level", "region_code", "income_range_code", target_col
+    ])
     df["education_level"] = df["education_level"].fillna("Missing")
     df = df.dropna(subset=["region_code", "income_range_code", "age_of_reference_person", target_col])
 
@@ -32,4 +42,19 @@ def make_preprocessor():
     return ColumnTransformer([
         ("cat", cat_pipeline, categorical),
         ("num", num_pipeline, numeric)
-    ])
\ No newline at end of file
+    ])
+
+def make_pipeline(clf, cache_dir=PIPELINE_CACHE_DIR):
+    """
+    prep -> clf Pipeline for the search scripts. The fitted preprocessor is memoized on disk,
+    keyed on its parameters and the training fold, so every candidate of a search reuses the
+    imputer / one-hot / scaler fit of its fold instead of refitting it. cache_dir=None disables it.
+    """
+    memory = None
+    if cache_dir:
+        memory = Memory(cache_dir, verbose=0)
+        memory.reduce_size(bytes_limit=PIPELINE_CACHE_MAX_BYTES)
+    return Pipeline([
+        ("prep", make_preprocessor()),
+        ("clf", clf)
+    ], memory=memory)
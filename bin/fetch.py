@@ -0,0 +1,131 @@
+"""
+Download the PUMD ZIP in chunks to '<dest>.part', resuming with a Range request after a
+broken transfer and retrying with backoff. The file is only renamed into place once it is
+complete and, if --sha256 is given, verified. file:// URLs and mirror directories are copied.
+
+Usage:
+    python bin/fetch.py https://www.bls.gov/cex/pumd/data/csv/intrvw23.zip data_source/intrvw23.zip
+    python bin/fetch.py file:///mnt/pumd/intrvw23.zip data_source/intrvw23.zip --sha256 <hex>
+"""
+import os
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+import requests
+from urllib.parse import urlparse, unquote
+from urllib.request import url2pathname
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+MIRROR_ENV = "PUMD_MIRROR"
+
+
+class ChecksumMismatch(ValueError):
+    pass
+
+
+def sha256_of(path, chunk_size=CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _mirror_source(url, mirror):
+    """Local file to copy from, if `url` is file:// or `mirror` holds the same file name."""
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        return url2pathname(unquote(parsed.path))
+    if mirror:
+        if mirror.startswith("file://"):
+            mirror = url2pathname(unquote(urlparse(mirror).path))
+        candidate = os.path.join(mirror, os.path.basename(parsed.path))
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _copy_local(source, part, chunk_size):
+    with open(source, "rb") as src, open(part, "wb") as out:
+        shutil.copyfileobj(src, out, chunk_size)
+
+
+def _download_once(url, part, headers, chunk_size, timeout):
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    request_headers = dict(headers)
+    if offset:
+        request_headers["Range"] = f"bytes={offset}-"
+
+    with requests.get(url, headers=request_headers, stream=True, timeout=timeout) as r:
+        if r.status_code == 416:
+            # Range starts at or past the end: the .part is already complete
+            return
+        r.raise_for_status()
+        if offset and r.status_code != 206:
+            logger.info("Server ignored the Range request; restarting download.")
+            offset = 0
+        elif offset:
+            logger.info(f"Resuming download at byte {offset:,}")
+
+        with open(part, "ab" if offset else "wb") as out:
+            for block in r.iter_content(chunk_size=chunk_size):
+                out.write(block)
+
+
+def fetch(url, dest, mirror=None, sha256=None, headers=None, retries=5,
+          chunk_size=CHUNK_SIZE, timeout=60):
+    """
+    Make `dest` a complete copy of `url`. Returns dest.
+
+    `mirror` (or $PUMD_MIRROR) is a directory or file:// URL checked for a file of the
+    same name before the network is touched. Raises ChecksumMismatch if `sha256` is
+    given and does not match; the bad .part is removed so the next run starts clean.
+    """
+    headers = {**DEFAULT_HEADERS, **(headers or {})}
+    mirror = mirror or os.environ.get(MIRROR_ENV)
+    part = dest + ".part"
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+
+    local = _mirror_source(url, mirror)
+    if local:
+        logger.info(f"Copying from local mirror: {local}")
+        _copy_local(local, part, chunk_size)
+    else:
+        for attempt in range(1, retries + 1):
+            try:
+                _download_once(url, part, headers, chunk_size, timeout)
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt == retries:
+                    raise
+                wait = 2 ** attempt
+                logger.warning(f"Download interrupted ({e}); retry {attempt}/{retries - 1} in {wait}s")
+                time.sleep(wait)
+
+    if sha256:
+        actual = sha256_of(part, chunk_size)
+        if actual.lower() != sha256.lower():
+            os.remove(part)
+            raise ChecksumMismatch(f"sha256 mismatch for {os.path.basename(dest)}: expected {sha256}, got {actual}")
+
+    os.replace(part, dest)
+    return dest
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="⬇️ %(levelname)s: %(message)s")
+
+    parser = argparse.ArgumentParser(description="Resumable download of a PUMD archive.")
+    parser.add_argument("url", help="http(s):// or file:// URL")
+    parser.add_argument("dest", help="Where to write the file")
+    parser.add_argument("--mirror", help=f"Local mirror directory or file:// URL (default: ${MIRROR_ENV})")
+    parser.add_argument("--sha256", help="Expected sha256 of the file")
+    args = parser.parse_args()
+
+    fetch(args.url, args.dest, mirror=args.mirror, sha256=args.sha256)
+    logger.info(f"✅ Saved {args.dest}")
@@ -0,0 +1,201 @@
+"""
+Batched z, Welch, permutation and bootstrap tests of B vs A for many segment x metric pairs.
+
+Arms and segments come from ab_stats, so the rows line up with ab_segments.py. All cells sit
+back to back in one flat array, so the analytic tests for every pair are a few reduceat calls.
+Permutations and bootstrap resamples are drawn as index matrices in memory-bounded chunks.
+p-values are then adjusted per test family (Holm, Bonferroni or Benjamini-Hochberg).
+
+    table = run_tests(df, cross_segments(df, ["region_code"]), metrics=["y"], tests=TESTS)
+"""
+import os
+import math
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, stdtr
+from ab_stats import assign_arms, segment_label
+
+TESTS = ("z", "welch", "permutation", "bootstrap")
+CORRECTIONS = ("holm", "bonferroni", "bh", "none")
+MIN_ARM_SIZE = 5  # same floor as ab_segments.py, so both tables cover the same segments
+DEFAULT_RESAMPLES = 2000
+CHUNK_ELEMENTS = 1 << 22  # resamples x rows per chunk, ~32 MB of float64 per matrix
+
+
+class Cells(NamedTuple):
+    """Values of every (pair, arm) cell back to back: pair p's arm A, then its arm B."""
+    values: np.ndarray  # (rows,)
+    starts: np.ndarray  # (pairs, 2) offsets into values
+    sizes: np.ndarray   # (pairs, 2)
+    pairs: pd.DataFrame  # one row per pair: segment, its columns, metric
+
+
+def build_cells(df: pd.DataFrame, segments: list, metrics, min_size=MIN_ARM_SIZE) -> Cells:
+    """Gather each (segment, metric, arm) cell; pairs with an arm under min_size rows are left out."""
+    blocks, sizes, pairs = [], [], []
+    by_keys = {}
+    for segment in segments:
+        by_keys.setdefault(tuple(segment), []).append(segment)
+
+    arm = df["arm"].to_numpy()
+    for keys, group in by_keys.items():
+        indices = df.groupby(list(keys)).indices if keys else {(): np.arange(len(df))}
+        positions = {k if isinstance(k, tuple) else (k,): v for k, v in indices.items()}
+        for segment in group:
+            rows = positions.get(tuple(segment.values()), np.array([], dtype="int64"))
+            for metric in metrics:
+                x = df[metric].to_numpy(dtype="float64")[rows]
+                ok = ~np.isnan(x)
+                a, b = x[ok & (arm[rows] == 0)], x[ok & (arm[rows] == 1)]
+                if min(len(a), len(b)) < min_size:
+                    continue
+                blocks += [a, b]
+                sizes.append((len(a), len(b)))
+                pairs.append({"segment": segment_label(segment), **segment, "metric": metric})
+
+    sizes = np.array(sizes, dtype="int64").reshape(-1, 2)
+    starts = np.concatenate([[0], np.cumsum(sizes.ravel())[:-1]]).reshape(-1, 2) if len(sizes) else sizes
+    values = np.concatenate(blocks) if blocks else np.array([])
+    return Cells(values, starts, sizes, pd.DataFrame(pairs))
+
+
+def cell_moments(cells: Cells):
+    """Per-cell mean and sample variance (ddof=1), each shaped (pairs, 2)."""
+    flat_starts, n = cells.starts.ravel(), cells.sizes.ravel()
+    mean = np.add.reduceat(cells.values, flat_starts) / n
+    dev = cells.values - np.repeat(mean, n)
+    var = np.add.reduceat(dev ** 2, flat_starts) / (n - 1)
+    return mean.reshape(-1, 2), var.reshape(-1, 2)
+
+
+# --- Analytic tests ---
+def one_sample_z(sample_mean, n, population_mean, population_std):
+    """z statistic and two-sided p-value against a known population mean and sd."""
+    z = (np.asarray(sample_mean) - population_mean) / (population_std / np.sqrt(n))
+    return z, 2 * ndtr(-np.abs(z))
+
+
+def z_test(mean, var, n):
+    """Two-sample z test of mean_B - mean_A with unpooled variances (large samples)."""
+    se = np.sqrt(var[:, 0] / n[:, 0] + var[:, 1] / n[:, 1])
+    z = (mean[:, 1] - mean[:, 0]) / se
+    return z, 2 * ndtr(-np.abs(z))
+
+
+def welch_test(mean, var, n):
+    """Welch's t test with Welch-Satterthwaite degrees of freedom."""
+    se2 = var / n
+    se = np.sqrt(se2.sum(axis=1))
+    dof = se2.sum(axis=1) ** 2 / (se2[:, 0] ** 2 / (n[:, 0] - 1) + se2[:, 1] ** 2 / (n[:, 1] - 1))
+    t = (mean[:, 1] - mean[:, 0]) / se
+    return t, dof, 2 * stdtr(dof, -np.abs(t))
+
+
+# --- Resampling ---
+def _permutation_chunk(cells: Cells, observed, n_resamples, seed):
+    """Count permuted |diff| >= observed |diff| per pair over n_resamples relabelings."""
+    rng = np.random.default_rng(seed)
+    pair_n = cells.sizes.sum(axis=1)
+    pair_starts = cells.starts[:, 0]
+    pair_of_row = np.repeat(np.arange(len(pair_n)), pair_n)
+    # After relabeling, the first n_B rows of each pair's slice form arm B
+    in_b = np.arange(len(cells.values)) - pair_starts[pair_of_row] < cells.sizes[pair_of_row, 1]
+    totals = np.add.reduceat(cells.values, pair_starts)
+
+    # Adding the pair index to uniform keys shuffles every pair's slice in place with one sort
+    order = np.argsort(rng.random((n_resamples, len(cells.values))) + pair_of_row, axis=1)
+    sum_b = np.add.reduceat(np.where(in_b, cells.values[order], 0.0), pair_starts, axis=1)
+    diff = sum_b / cells.sizes[:, 1] - (totals - sum_b) / cells.sizes[:, 0]
+    return (np.abs(diff) >= np.abs(observed) * (1 - 1e-12)).sum(axis=0)
+
+
+def _bootstrap_chunk(cells: Cells, n_resamples, seed):
+    """Bootstrap draws of mean_B - mean_A, shaped (n_resamples, pairs); arms are resampled separately."""
+    rng = np.random.default_rng(seed)
+    n = cells.sizes.ravel()
+    row_start = np.repeat(cells.starts.ravel(), n)
+    row_size = np.repeat(n, n)
+    index = row_start + (rng.random((n_resamples, len(cells.values))) * row_size).astype("int64")
+    means = np.add.reduceat(cells.values[index], cells.starts.ravel(), axis=1) / n
+    return means[:, 1::2] - means[:, 0::2]
+
+
+def _chunked(fn, cells, n_resamples, seed, n_jobs, *args):
+    """Run fn over chunks of resamples bounded by CHUNK_ELEMENTS, in parallel when there is more than one."""
+    from joblib import Parallel, delayed  # only the resampling tests need it
+
+    n_jobs = n_jobs if n_jobs > 0 else os.cpu_count() or 1
+    per_chunk = max(1, min(CHUNK_ELEMENTS // max(len(cells.values), 1), math.ceil(n_resamples / n_jobs)))
+    sizes = [min(per_chunk, n_resamples - i) for i in range(0, n_resamples, per_chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = (delayed(fn)(cells, *args, size, s) for size, s in zip(sizes, seeds))
+    return Parallel(n_jobs=min(n_jobs, len(sizes)))(tasks)
+
+
+def permutation_test(cells: Cells, observed, n_resamples=DEFAULT_RESAMPLES, seed=0, n_jobs=-1):
+    """Two-sided permutation p-values for mean_B - mean_A, (1 + extreme) / (1 + resamples)."""
+    extreme = sum(_chunked(_permutation_chunk, cells, n_resamples, seed, n_jobs, observed))
+    return (1 + extreme) / (1 + n_resamples)
+
+
+def bootstrap_ci(cells: Cells, n_resamples=DEFAULT_RESAMPLES, alpha=0.05, seed=0, n_jobs=-1):
+    """Percentile bootstrap CI of mean_B - mean_A, as (low, high) arrays."""
+    draws = np.vstack(_chunked(_bootstrap_chunk, cells, n_resamples, seed, n_jobs))
+    return np.quantile(draws, [alpha / 2, 1 - alpha / 2], axis=0)
+
+
+# --- Multiple comparisons ---
+def adjust_pvalues(p, method="holm"):
+    """Family-wise (holm, bonferroni) or false-discovery-rate (bh) adjusted p-values; NaNs stay NaN."""
+    if method not in CORRECTIONS:
+        raise ValueError(f"Unknown correction {method!r}; choose from {CORRECTIONS}")
+    p = np.asarray(p, dtype="float64")
+    adjusted = np.full_like(p, np.nan)
+    valid = ~np.isnan(p)
+    m = int(valid.sum())
+    if m == 0 or method == "none":
+        return p.copy()
+
+    order = np.argsort(p[valid])
+    ranked = p[valid][order]
+    if method == "bonferroni":
+        out = ranked * m
+    elif method == "holm":
+        out = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    else:
+        out = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    result = np.empty(m)
+    result[order] = np.minimum(out, 1.0)
+    adjusted[valid] = result
+    return adjusted
+
+
+# --- Driver ---
+def run_tests(df: pd.DataFrame, segments: list, metrics=("y",), tests=TESTS, arm_col="income_range_code",
+              n_resamples=DEFAULT_RESAMPLES, correction="holm", alpha=0.05, seed=0, n_jobs=-1) -> pd.DataFrame:
+    """One row per (segment, metric): arm sizes and means, diff = B - A, and each test's statistic and p-values."""
+    unknown = set(tests) - set(TESTS)
+    if unknown:
+        raise ValueError(f"Unknown tests {sorted(unknown)}; choose from {TESTS}")
+    cells = build_cells(assign_arms(df, arm_col), segments, metrics)
+    if cells.pairs.empty:
+        raise ValueError("No segment x metric pair has enough rows in both arms.")
+
+    mean, var = cell_moments(cells)
+    n = cells.sizes
+    diff = mean[:, 1] - mean[:, 0]
+    table = cells.pairs.assign(n_a=n[:, 0], n_b=n[:, 1], mean_a=mean[:, 0], mean_b=mean[:, 1], diff=diff)
+
+    if "z" in tests:
+        table["z"], table["p_z"] = z_test(mean, var, n)
+    if "welch" in tests:
+        table["t"], table["df"], table["p_welch"] = welch_test(mean, var, n)
+    if "permutation" in tests:
+        table["p_permutation"] = permutation_test(cells, diff, n_resamples, seed, n_jobs)
+    if "bootstrap" in tests:
+        table["ci_low"], table["ci_high"] = bootstrap_ci(cells, n_resamples, alpha, seed, n_jobs)
+
+    for col in [c for c in ("p_z", "p_welch", "p_permutation") if c in table]:
+        table[f"{col}_adj"] = adjust_pvalues(table[col], correction)
+    return table
@@ -1,16 +1,20 @@
+import argparse
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.pipeline import Pipeline
-from sklearn.model_selection import GridSearchCV
 from sklearn.metrics import classification_report
-from data_preprocessing import load_and_split, make_preprocessor
+from data_preprocessing import load_and_split, make_pipeline
+from search_runner import ResultStore, run_search, report
+
+parser = argparse.ArgumentParser(description="Decision tree hyperparameter search.")
+parser.add_argument("--strategy", choices=["grid", "halving"], default="grid",
+                    help="halving: successive halving over the grid on training rows")
+parser.add_argument("--compare", action="store_true", help="Run both strategies and report time-to-best-score")
+parser.add_argument("--no-store", action="store_true", help="Ignore and don't update the persistent results store")
+args = parser.parse_args()
 
 X_train, X_test, y_train, y_test = load_and_split()
-preprocessor = make_preprocessor()
 
-pipeline = Pipeline([
-    ("prep", preprocessor),
-    ("clf", DecisionTreeClassifier(random_state=42))
-])
+# Preprocessing is fitted once per CV fold and shared by all candidates
+pipeline = make_pipeline(DecisionTreeClassifier(random_state=42))
 
 param_grid = {
     "clf__max_depth": [3, 5, 10],
@@ -18,8 +22,20 @@ param_grid = {
     "clf__criterion": ["gini", "entropy"]
 }
 
-grid = GridSearchCV(pipeline, param_grid, cv=5)
-grid.fit(X_train, y_train)
+def search(strategy):
+    return run_search(
+        "decision_tree", pipeline, param_grid, X_train, y_train,
+        strategy=strategy, cv=5, resource="n_samples",
+        store=ResultStore(None) if args.no_store else None,
+    )
+
+if args.compare:
+    results = [search("grid"), search("halving")]
+    print("⏱️ Strategy comparison:\n", report(results).to_string())
+    result = max(results, key=lambda r: r.best_score)
+else:
+    result = search(args.strategy)
 
-print("🔎 Best Parameters:", grid.best_params_)
-print("\n📋 Classification Report:\n", classification_report(y_test, grid.predict(X_test)))
\ No newline at end of file
+print("🔎 Best Parameters:", result.best_params)
+best_model = pipeline.set_params(**result.best_params).fit(X_train, y_train)
+print("\n📋 Classification Report:\n", classification_report(y_test, best_model.predict(X_test)))
@@ -0,0 +1,152 @@
+"""
+Readers for the CE PUMD interview files that parse only what the dataset uses.
+
+EXPN/MTBI files are read as NEWID plus the amount column, in chunks folded into running
+per-NEWID totals, so memory follows the number of consumer units rather than file size. FMLI
+reads only the demographic columns. A fresh Parquet mirror is used when there is one, and
+pumd_zip.ZipMember sources are streamed straight out of the archive.
+"""
+import os
+import logging
+import contextlib
+import numpy as np
+import pandas as pd
+from columnar_cache import fresh_cache_path, read_schema_columns, iter_cached_batches
+
+logger = logging.getLogger(__name__)
+
+# Amount columns we know how to aggregate, in CE PUMD naming
+SPENDING_COLS = {"COST", "VALUE", "AMOUNT", "EXPNAMT", "DOLAMT", "VAL", "EXPNS"}
+
+# FMLI columns used downstream. AGE_REF and REGION are nullable so that a blank cell
+# loads as <NA> and build_consumer_spending's dropna() drops that unit, as before.
+FMLI_DTYPES = {
+    "NEWID": "int64",
+    "AGE_REF": "Int64",
+    "EDUCA2": "float64",
+    "REGION": "Int64",
+    "INCOMEY2": "float64",
+}
+
+DEFAULT_CHUNKSIZE = 250_000
+
+
+def _open(path):
+    # Filesystem paths go straight to pandas; ZIP members are opened as streams
+    return contextlib.nullcontext(path) if isinstance(path, (str, os.PathLike)) else path.open()
+
+
+def _fresh_cache(path):
+    return fresh_cache_path(path) if isinstance(path, (str, os.PathLike)) else None
+
+
+def read_header(path) -> list:
+    """Return the column names of a CSV without parsing any rows."""
+    cached = _fresh_cache(path)
+    if cached:
+        return read_schema_columns(cached)
+    with _open(path) as src:
+        return pd.read_csv(src, nrows=0).columns.tolist()
+
+
+def find_amount_column(columns, candidates=SPENDING_COLS):
+    """Pick the first column whose upper-cased name is a known amount column."""
+    return next((c for c in columns if c.upper() in candidates), None)
+
+
+def load_fmli(path, dtypes=None) -> pd.DataFrame:
+    """Load only the FMLI demographic columns, with explicit dtypes."""
+    dtypes = dtypes or FMLI_DTYPES
+    cached = _fresh_cache(path)
+    if cached:
+        return pd.read_parquet(cached, columns=list(dtypes), memory_map=True).astype(dtypes)
+    with _open(path) as src:
+        return pd.read_csv(src, usecols=list(dtypes), dtype=dtypes)
+
+
+def _read_amount_chunks(path, amount_col, chunksize):
+    with _open(path) as src, pd.read_csv(
+        src,
+        usecols=["NEWID", amount_col],
+        dtype={"NEWID": "int64", amount_col: "float64"},
+        chunksize=chunksize,
+    ) as reader:
+        yield from reader
+
+
+def _read_amount_chunks_coerced(path, amount_col, chunksize):
+    # Fallback for amount columns with stray non-numeric tokens
+    with _open(path) as src, pd.read_csv(
+        src,
+        usecols=["NEWID", amount_col],
+        dtype={"NEWID": "int64", amount_col: "object"},
+        chunksize=chunksize,
+    ) as reader:
+        for chunk in reader:
+            chunk[amount_col] = pd.to_numeric(chunk[amount_col], errors="coerce")
+            yield chunk
+
+
+def _read_cached_amount_chunks(cached, amount_col, chunksize):
+    for chunk in iter_cached_batches(cached, ["NEWID", amount_col], chunksize):
+        chunk[amount_col] = pd.to_numeric(chunk[amount_col], errors="coerce")
+        yield chunk
+
+
+def _fold_chunks(chunks, amount_col) -> pd.Series:
+    totals = None
+    for chunk in chunks:
+        partial = chunk.groupby("NEWID")[amount_col].sum()
+        totals = partial if totals is None else totals.add(partial, fill_value=0)
+    if totals is None:
+        totals = pd.Series(dtype="float64", index=pd.Index([], dtype="int64", name="NEWID"))
+    return totals.rename(amount_col)
+
+
+def aggregate_spending(path, amount_col=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Stream a spending file and return total amount per NEWID as a Series.
+
+    Returns None when the file has no NEWID or no recognised amount column.
+    """
+    columns = read_header(path)
+    amount_col = amount_col or find_amount_column(columns)
+    if not amount_col or "NEWID" not in columns:
+        return None
+
+    cached = _fresh_cache(path)
+    if cached:
+        return _fold_chunks(_read_cached_amount_chunks(cached, amount_col, chunksize), amount_col)
+
+    try:
+        totals = _fold_chunks(_read_amount_chunks(path, amount_col, chunksize), amount_col)
+    except ValueError:
+        logger.info(f"Non-numeric values in '{amount_col}', coercing while streaming")
+        totals = _fold_chunks(_read_amount_chunks_coerced(path, amount_col, chunksize), amount_col)
+    return totals
+
+
+def pivot_by_quarter(quarter_totals: dict, total_col="TOTAL_SPENDING") -> pd.DataFrame:
+    """
+    Combine per-quarter NEWID totals into one wide table in a single pass.
+
+    quarter_totals maps an output column name to a Series of amounts indexed by NEWID.
+    The (NEWID, quarter, amount) triples are concatenated once and scattered into a
+    dense units x quarters array with np.bincount; missing quarters are 0. Returns
+    NEWID, one column per quarter and total_col, sorted by NEWID.
+    """
+    names = list(quarter_totals)
+    series = [quarter_totals[name] for name in names]
+    newids = np.concatenate([s.index.to_numpy() for s in series])
+    amounts = np.concatenate([s.to_numpy(dtype="float64") for s in series])
+    quarters = np.repeat(np.arange(len(names)), [len(s) for s in series])
+
+    units, rows = np.unique(newids, return_inverse=True)
+    wide = np.bincount(
+        rows * len(names) + quarters, weights=amounts, minlength=len(units) * len(names)
+    ).reshape(len(units), len(names))
+
+    out = pd.DataFrame(wide, columns=names)
+    out.insert(0, "NEWID", units)
+    out[total_col] = wide.sum(axis=1)
+    return out
@@ -0,0 +1,305 @@
+"""
+Stage timing for the bin/ scripts: wall and CPU time, peak RSS and row counts.
+
+Wrap a stage in `with stage("read_csv") as s:` or decorate it with @instrumented("download").
+Each finished stage appends one JSON line to $INSTRUMENT_LOG. On Linux the peak RSS is the
+stage's own, because the kernel high-water mark is reset on entry. Nothing is recorded unless
+INSTRUMENT_LOG is set, and the disabled hooks cost a function call.
+
+Environment:
+    INSTRUMENT_LOG=<path>|-         enable; append JSON events to <path> ("-" = stderr)
+    INSTRUMENT_PROFILE=cprofile|sample
+    INSTRUMENT_PROFILE_DIR=<path>   default: <repo>/.cache/profiles
+    INSTRUMENT_SAMPLE_MS=<int>      sampling interval, default 5
+
+Usage:
+    INSTRUMENT_LOG=events.jsonl python bin/generate.py --skip-download
+    python bin/instrument.py events.jsonl        # per-stage summary table
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import resource
+import functools
+import threading
+import traceback
+import collections
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PROFILE_DIR = os.environ.get("INSTRUMENT_PROFILE_DIR", os.path.join(BASE_DIR, ".cache", "profiles"))
+PROFILERS = ("cprofile", "sample")
+_CLEAR_REFS = "/proc/self/clear_refs"
+_STATUS = "/proc/self/status"
+
+
+class _Config:
+    def __init__(self):
+        self.log = os.environ.get("INSTRUMENT_LOG") or None
+        self.profile = os.environ.get("INSTRUMENT_PROFILE") or None
+        self.sample_ms = int(os.environ.get("INSTRUMENT_SAMPLE_MS", "5"))
+
+    @property
+    def enabled(self) -> bool:
+        return self.log is not None
+
+
+config = _Config()
+_local = threading.local()
+
+
+def configure(log=None, profile=None):
+    """Enable instrumentation from code (e.g. a --instrument flag); log=None disables it."""
+    if profile is not None and profile not in PROFILERS:
+        raise ValueError(f"Unknown profiler {profile!r}; choose from {PROFILERS}")
+    config.log, config.profile = log, profile
+
+
+# --- Measurements ---
+def clock():
+    """(wall, CPU) seconds; CPU includes finished child processes such as pool workers."""
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.perf_counter(), time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _status_kb(field):
+    try:
+        with open(_STATUS) as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak() -> bool:
+    """Reset the kernel's RSS high-water mark (Linux >= 4.0); False where that isn't possible."""
+    try:
+        with open(_CLEAR_REFS, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    hwm = _status_kb("VmHWM:")
+    if hwm is not None:
+        return hwm / 1024
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1 << 20) if sys.platform == "darwin" else maxrss / 1024
+
+
+def _rss_mb():
+    rss = _status_kb("VmRSS:")
+    return rss / 1024 if rss is not None else None
+
+
+# --- Profilers ---
+class _SamplingProfiler:
+    """Samples the instrumented thread's stack every interval and counts collapsed stacks."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id, self.interval = thread_id, interval
+        self.counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, path):
+        self._stop.set()
+        self._thread.join()
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _start_profiler():
+    if config.profile == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if config.profile == "sample":
+        profiler = _SamplingProfiler(threading.get_ident(), config.sample_ms / 1000)
+        profiler.start()
+        return profiler
+    return None
+
+
+def _stop_profiler(profiler, name):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    if config.profile == "cprofile":
+        profiler.disable()
+        path = os.path.join(PROFILE_DIR, f"{name}-{stamp}-{os.getpid()}.prof")
+        profiler.dump_stats(path)
+    else:
+        path = os.path.join(PROFILE_DIR, f"{name}-{stamp}-{os.getpid()}.folded")
+        profiler.stop(path)
+    return path
+
+
+# --- Stages ---
+def _emit(event):
+    line = json.dumps(event, default=str) + "\n"
+    if config.log == "-":
+        sys.stderr.write(line)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(config.log)), exist_ok=True)
+    with open(config.log, "a") as f:
+        f.write(line)
+
+
+class Stage:
+    """One running stage; set .rows or call .add(**fields) to attach counts to its event."""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.rows = fields.pop("rows", None)
+        self.fields = fields
+        self.child_peak = 0.0
+
+    def add(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        stack = _local.__dict__.setdefault("stack", [])
+        self.parent = stack[-1] if stack else None
+        if self.parent is not None:
+            # Keep the parent's peak so far before this stage resets the high-water mark
+            self.parent.child_peak = max(self.parent.child_peak, peak_rss_mb())
+        stack.append(self)
+        self.started_at = datetime.datetime.now().isoformat(timespec="milliseconds")
+        self.rss_start = _rss_mb()
+        self.peak_scope = "stage" if reset_peak() else "process"
+        self.profiler = _start_profiler()
+        self.start = clock()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = clock()
+        profile_path = _stop_profiler(self.profiler, self.name) if self.profiler else None
+        _local.stack.pop()
+
+        # Children reset the high-water mark, so this stage's peak also includes what was folded in before each
+        peak = max(peak_rss_mb(), self.child_peak)
+        if self.parent is not None:
+            self.parent.child_peak = max(self.parent.child_peak, peak)
+        rss_end = _rss_mb()
+
+        event = {
+            "event": "stage",
+            "stage": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "script": os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "wall_s": round(end[0] - self.start[0], 6),
+            "cpu_s": round(end[1] - self.start[1], 6),
+            "peak_rss_mb": round(peak, 1),
+            "peak_rss_scope": self.peak_scope,
+            "rss_delta_mb": round(rss_end - self.rss_start, 1) if rss_end is not None and self.rss_start is not None else None,
+            "rows": self.rows,
+            "status": "ok" if exc_type is None else "error",
+            **self.fields,
+        }
+        if exc_type is not None:
+            event["error"] = "".join(traceback.format_exception_only(exc_type, exc)).strip()
+        if profile_path:
+            event["profile"] = profile_path
+        _emit(event)
+        return False
+
+
+class _NullStage:
+    """Shared no-op stand-in while instrumentation is disabled."""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+    def add(self, **fields):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, **fields):
+    """Context manager timing one stage; a shared no-op when instrumentation is disabled."""
+    if not config.enabled:
+        return _NULL_STAGE
+    return Stage(name, fields)
+
+
+def _row_count(result):
+    if isinstance(result, tuple):
+        return _row_count(result[0]) if result else None
+    shape = getattr(result, "shape", None)
+    if shape:
+        return int(shape[0])
+    return len(result) if isinstance(result, (list, dict)) else None
+
+
+def instrumented(name, rows=_row_count):
+    """Decorator form of stage(); rows(result) gives the row count (default: len of a DataFrame/array result)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not config.enabled:
+                return fn(*args, **kwargs)
+            with Stage(name, {}) as s:
+                result = fn(*args, **kwargs)
+                s.rows = rows(result) if rows else None
+                return result
+        return wrapper
+    return decorator
+
+
+# --- Reporting ---
+def summarize(path):
+    """Per-stage totals from an event log: calls, wall / CPU seconds, max peak RSS, rows and rows/s."""
+    import pandas as pd
+
+    events = pd.read_json(path, lines=True)
+    events = events[events["event"] == "stage"]
+    table = events.groupby("stage").agg(
+        calls=("wall_s", "size"), wall_s=("wall_s", "sum"), cpu_s=("cpu_s", "sum"),
+        peak_rss_mb=("peak_rss_mb", "max"), rows=("rows", "sum"), errors=("status", lambda s: int((s != "ok").sum())),
+    )
+    table["rows_per_s"] = (table["rows"] / table["wall_s"]).where(table["rows"] > 0)
+    return table.sort_values("wall_s", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize an instrumentation event log.")
+    parser.add_argument("log", help="JSON lines written via INSTRUMENT_LOG")
+    args = parser.parse_args()
+    import pandas as pd
+
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print("⏱️ Stages by total wall time:\n", summarize(args.log).round(3).to_string())
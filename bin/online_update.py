@@ -0,0 +1,205 @@
+"""
+Keep the spending A/B test and the spending-vs-income regression up to date batch by batch.
+
+The state file holds only conjugate statistics: per-arm (n, mean, m2) and the regression's
+(n, XtX, Xty, yty). Absorbing a new quarter costs time proportional to that batch. A file that
+was already absorbed is recognised by its sha256 and skipped. The income cutoff and
+standardization are fixed by the first batch. `reconcile` checks the online posterior against
+a full sampler fit.
+
+Usage:
+    python bin/online_update.py absorb data/consumer_spending.csv
+    python bin/online_update.py absorb data/new_quarter.csv
+    python bin/online_update.py summary
+    python bin/online_update.py reconcile --data data/consumer_spending.csv
+"""
+import os
+import json
+import logging
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+from ab_stats import NormalStats, weak_prior, conjugate_ab_draws
+from columnar_cache import read_csv_cached, file_sha256
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STATE_PATH = os.path.join(BASE_DIR, "data", "online_state.json")
+ARM_COL = "income_range_code"
+VALUE_COL = "total_annual_spending"
+COLUMNS = [VALUE_COL, ARM_COL]
+ARMS = ("A", "B")
+DRAWS = 4000
+HDI_PROB = 0.94
+
+# Regression prior: coef | s² ~ N(0, s² V0), s² ~ InvGamma(1, 1); V0 matches the Normal(0, 10) / Normal(0, 1) priors
+REG_PRIOR_SCALES = np.array([10.0, 1.0])
+REG_ALPHA0 = 1.0
+REG_BETA0 = 1.0
+
+
+def new_state() -> dict:
+    return {"batches": [], "ab": None, "regression": None}
+
+
+def load_state(path=STATE_PATH) -> dict:
+    if not os.path.exists(path):
+        return new_state()
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def clean_batch(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.dropna(subset=COLUMNS)
+    df = df[df[VALUE_COL] > -1]
+    return df.assign(y=np.log1p(df[VALUE_COL]))
+
+
+# --- A/B: per-arm Normal sufficient statistics ---
+def absorb_ab(ab, df):
+    if ab is None:
+        ab = {"cutoff": float(df[ARM_COL].median()), "stats": {arm: list(NormalStats(0, 0.0, 0.0)) for arm in ARMS}}
+    is_b = (df[ARM_COL] > ab["cutoff"]).to_numpy()
+    for arm, mask in zip(ARMS, (~is_b, is_b)):
+        merged = NormalStats(*ab["stats"][arm]).merge(NormalStats.from_array(df["y"].to_numpy()[mask]))
+        ab["stats"][arm] = [int(merged.n), merged.mean, merged.m2]
+    return ab
+
+
+def ab_posterior(ab, draws=DRAWS, seed=42) -> dict:
+    stats_a, stats_b = (NormalStats(*ab["stats"][arm]) for arm in ARMS)
+    post_a = weak_prior(stats_a.mean).update(stats_a)
+    post_b = weak_prior(stats_b.mean).update(stats_b)
+    diff = conjugate_ab_draws(post_a, post_b, chains=1, draws=draws, seed=seed)["diff"].ravel()
+    low, high = _hdi(diff, HDI_PROB)
+    return {
+        "n_a": stats_a.n, "n_b": stats_b.n,
+        "mu_a": post_a.m, "mu_b": post_b.m,
+        "diff_mean": float(diff.mean()), "diff_sd": float(diff.std()),
+        "hdi_low": low, "hdi_high": high,
+        "p_b_gt_a": float((diff > 0).mean()),
+    }
+
+
+def _hdi(samples, prob):
+    ordered = np.sort(samples)
+    width = int(np.floor(prob * len(ordered)))
+    start = int(np.argmin(ordered[width:] - ordered[: len(ordered) - width]))
+    return float(ordered[start]), float(ordered[start + width])
+
+
+# --- Regression: y = alpha + beta * income_std, conjugate Normal-Inverse-Gamma ---
+def absorb_regression(reg, df):
+    if reg is None:
+        x = df[ARM_COL]
+        reg = {"x_mean": float(x.mean()), "x_std": float(x.std()), "n": 0,
+               "xtx": np.zeros((2, 2)).tolist(), "xty": [0.0, 0.0], "yty": 0.0}
+    x = ((df[ARM_COL] - reg["x_mean"]) / reg["x_std"]).to_numpy()
+    X = np.column_stack([np.ones_like(x), x])
+    y = df["y"].to_numpy()
+    reg["n"] += int(len(y))
+    reg["xtx"] = (np.asarray(reg["xtx"]) + X.T @ X).tolist()
+    reg["xty"] = (np.asarray(reg["xty"]) + X.T @ y).tolist()
+    reg["yty"] += float(y @ y)
+    return reg
+
+
+def regression_posterior(reg) -> dict:
+    prec0 = np.diag(1.0 / REG_PRIOR_SCALES ** 2)
+    prec = prec0 + np.asarray(reg["xtx"])
+    cov = np.linalg.inv(prec)
+    mean = cov @ np.asarray(reg["xty"])
+    alpha = REG_ALPHA0 + reg["n"] / 2
+    beta = REG_BETA0 + 0.5 * (reg["yty"] - mean @ prec @ mean)
+    # Student-t marginals with 2*alpha degrees of freedom
+    scale = np.sqrt(np.diag(cov) * beta / alpha)
+    return {
+        "n": reg["n"],
+        "alpha_mean": float(mean[0]), "alpha_sd": float(scale[0]),
+        "beta_mean": float(mean[1]), "beta_sd": float(scale[1]),
+        "sigma_mean": float(np.sqrt(beta / (alpha - 1))) if alpha > 1 else float("nan"),
+    }
+
+
+def absorb(path, state_path=STATE_PATH) -> bool:
+    """Fold one CSV batch into the persisted state. Returns False if it was already absorbed."""
+    state = load_state(state_path)
+    digest = file_sha256(path)
+    if any(b["sha256"] == digest for b in state["batches"]):
+        logger.info(f"⏭️ {path} already absorbed")
+        return False
+
+    df = clean_batch(read_csv_cached(path, columns=COLUMNS, build=False))
+    state["ab"] = absorb_ab(state["ab"], df)
+    state["regression"] = absorb_regression(state["regression"], df)
+    state["batches"].append({
+        "source": os.path.relpath(path, BASE_DIR),
+        "sha256": digest,
+        "rows": int(len(df)),
+        "absorbed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    })
+    save_state(state, state_path)
+    logger.info(f"✅ Absorbed {len(df)} rows from {path}")
+    return True
+
+
+def summary(state) -> dict:
+    if not state["batches"]:
+        raise ValueError("Online state is empty; absorb a batch first.")
+    return {"ab": ab_posterior(state["ab"]), "regression": regression_posterior(state["regression"])}
+
+
+def reconcile(state, data_path, likelihood="full") -> pd.DataFrame:
+    """Refit the sampler-based A/B model on the full data and line it up with the online posterior."""
+    # Imported here: configures PyTensor and loads PyMC only when reconciling
+    import arviz as az
+    import ab_test_bayesian_spending as ab_test
+
+    df = read_csv_cached(data_path, columns=["total_annual_spending", "spending_class", "income_range_code"])
+    group_a, group_b = ab_test.clean_and_split(df.sample(frac=1, random_state=42))
+    trace = ab_test.run_model(group_a, group_b, likelihood=likelihood)
+    diff = trace.posterior["diff"].values.ravel()
+    low, high = az.hdi(diff, hdi_prob=HDI_PROB)
+
+    online = ab_posterior(state["ab"])
+    sampled = {"n_a": len(group_a), "n_b": len(group_b), "diff_mean": float(diff.mean()),
+               "diff_sd": float(diff.std()), "hdi_low": float(low), "hdi_high": float(high),
+               "p_b_gt_a": float((diff > 0).mean())}
+    return pd.DataFrame({"online": pd.Series(online), "sampler": pd.Series(sampled)}, index=list(sampled))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s", datefmt="%H:%M:%S")
+    parser = argparse.ArgumentParser(description="Online conjugate updating of the spending A/B test and regression.")
+    parser.add_argument("--state", default=STATE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_absorb = sub.add_parser("absorb", help="Fold new batch CSVs into the state")
+    p_absorb.add_argument("paths", nargs="+")
+    sub.add_parser("summary", help="Print the current posterior")
+    p_reconcile = sub.add_parser("reconcile", help="Compare with a sampler refit on the full data")
+    p_reconcile.add_argument("--data", default=os.path.join(BASE_DIR, "data", "consumer_spending.csv"))
+    p_reconcile.add_argument("--likelihood", choices=["full", "sufficient"], default="full")
+    args = parser.parse_args()
+
+    if args.command == "absorb":
+        for path in args.paths:
+            absorb(path, args.state)
+
+    state = load_state(args.state)
+    if args.command == "reconcile":
+        print("\n🔁 Online vs sampler posterior of μ_B - μ_A:\n", reconcile(state, args.data, args.likelihood).round(3))
+    else:
+        result = summary(state)
+        print(f"\n📦 {len(state['batches'])} batches, {result['regression']['n']} rows")
+        print("\n🧾 A/B posterior (μ_B - μ_A):\n", pd.Series(result["ab"]).round(3).to_string())
+        print("\n📈 Regression posterior (log1p spending ~ income_std):\n", pd.Series(result["regression"]).round(3).to_string())
@@ -0,0 +1,294 @@
+"""
+Importable CE PUMD -> consumer_spending pipeline.
+
+Stages (no work happens at import time; every stage takes paths/years as arguments):
+- download(year)                      -> path to the release ZIP
+- extract(year)                       -> list of CSV sources (paths, or ZipMembers with from_zip=True)
+- load_fmli(sources)                  -> FMLI demographics DataFrame
+- aggregate_expenditures(sources)     -> NEWID, spending_<quarter>..., TOTAL_SPENDING (MTBI quarters)
+- discover_expenditures(sources)      -> NEWID, TOTAL_SPENDING (first file with a usable amount column)
+- build_consumer_spending(fmli, spend) -> the final consumer_spending DataFrame
+
+run_years(years, ...) builds several releases concurrently in a process pool and writes
+a dataset partitioned by year: <output_dir>/survey_year=2023/consumer_spending.parquet.
+
+run(year, ...) chains them the way bin/generate.py does; bin/generate_consumer_spending_dataset.py
+uses run(..., mode="discover").
+
+    import pipeline
+    sources = pipeline.extract(2023, only_needed=True)
+    df = pipeline.build_consumer_spending(pipeline.load_fmli(sources), pipeline.aggregate_expenditures(sources, 2023))
+"""
+import os
+import glob
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import ingest
+from columnar_cache import build_cache, pq
+from fetch import fetch
+from instrument import instrumented
+from pumd_zip import PIPELINE_PATTERNS, ZipMember, extract_zip, flattened_name, list_members, basename
+from schema_index import build_schema_index, spending_candidates, header_candidates
+
+logger = logging.getLogger(__name__)
+
+# --- Paths and Config ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+DATA_SOURCE_DIR = os.path.join(BASE_DIR, "data_source")
+OUTPUT_CSV = os.path.join(DATA_DIR, "consumer_spending.csv")
+OUTPUT_DATASET_DIR = os.path.join(DATA_DIR, "consumer_spending")
+CSV_DOWNLOAD_URL = "https://www.bls.gov/cex/pumd/data/csv/{release}.zip"
+DEFAULT_YEAR = 2023
+
+# Amount columns accepted when discovering a single EXPN file
+DISCOVERY_SPENDING_COLS = {"COST", "VALUE", "AMOUNT", "EXPNAMT"}
+
+EDUCATION_LABELS = {
+    31: "Less than HS", 32: "HS Graduate", 33: "Some College",
+    34: "Associate’s Degree", 35: "Bachelor’s Degree", 36: "Advanced Degree"
+}
+REGION_LABELS = {1: "Northeast", 2: "Midwest", 3: "South", 4: "West"}
+OUTPUT_COLUMNS = {
+    "NEWID": "consumer_unit_id",
+    "AGE_REF": "age_of_reference_person",
+    "EDUCA2": "education_level",
+    "REGION": "region_code",
+    "INCOMEY2": "income_range_code",
+    "TOTAL_SPENDING": "total_annual_spending",
+    "spending_category": "spending_class"
+}
+
+
+# --- Release Naming ---
+def release_name(year) -> str:
+    """2023 -> 'intrvw23'."""
+    return f"intrvw{int(year) % 100:02d}"
+
+
+def zip_path(year, source_dir=DATA_SOURCE_DIR) -> str:
+    return os.path.join(source_dir, f"{release_name(year)}.zip")
+
+
+def extract_dir(year, data_dir=DATA_DIR) -> str:
+    return os.path.join(data_dir, release_name(year))
+
+
+def quarter_files(year) -> list:
+    """The four MTBI files of a release: Q2-Q4 of `year` and Q1 of the next year."""
+    yy, next_yy = int(year) % 100, (int(year) + 1) % 100
+    return [f"mtbi{yy:02d}2.csv", f"mtbi{yy:02d}3.csv", f"mtbi{yy:02d}4.csv", f"mtbi{next_yy:02d}1.csv"]
+
+
+def parse_years(spec) -> list:
+    """'2019-2023' -> [2019, ..., 2023]; '2019,2021' -> [2019, 2021]."""
+    years = []
+    for part in str(spec).split(","):
+        if "-" in part:
+            start, end = (int(y) for y in part.split("-", 1))
+            years.extend(range(start, end + 1))
+        elif part.strip():
+            years.append(int(part))
+    return sorted(set(years))
+
+
+def partition_path(output_dir, year) -> str:
+    ext = "parquet" if pq is not None else "csv"
+    return os.path.join(output_dir, f"survey_year={int(year)}", f"consumer_spending.{ext}")
+
+
+# --- Stages ---
+@instrumented("download", rows=None)
+def download(year=DEFAULT_YEAR, source_dir=DATA_SOURCE_DIR, url=None, mirror=None, sha256=None) -> str:
+    """Fetch the release ZIP into source_dir unless it is already there."""
+    path = zip_path(year, source_dir)
+    if os.path.exists(path):
+        logger.info(f"ZIP already exists in {os.path.relpath(source_dir, BASE_DIR)}/")
+        return path
+    logger.info("Downloading CE Interview ZIP...")
+    return fetch(url or CSV_DOWNLOAD_URL.format(release=release_name(year)), path, mirror=mirror, sha256=sha256)
+
+
+@instrumented("extract", rows=None)
+def extract(year=DEFAULT_YEAR, zip_file=None, data_dir=DATA_DIR, only_needed=False, from_zip=False, cache=False) -> list:
+    """
+    Make the release's CSVs available and return them sorted by their path inside the release.
+
+    With from_zip=True nothing is written; the result is a list of ZipMembers.
+    Otherwise members are extracted (unchanged ones skipped) and, with cache=True, the
+    members the pipeline reads (PIPELINE_PATTERNS) are mirrored to Parquet.
+    """
+    zip_file = zip_file or zip_path(year)
+    root = release_name(year)
+    patterns = PIPELINE_PATTERNS if only_needed else None
+
+    if from_zip:
+        logger.info("Reading CSVs directly from the ZIP; skipping extraction.")
+        sources = sorted(list_members(zip_file, root, patterns), key=lambda m: flattened_name(m.name, root))
+    else:
+        target = extract_dir(year, data_dir)
+        logger.info("Extracting ZIP and flattening nested folders...")
+        logger.info(f"Extraction: {extract_zip(zip_file, target, root, patterns)}")
+        if cache:
+            logger.info(f"Columnar cache: {build_cache(target, patterns=PIPELINE_PATTERNS)}")
+        sources = sorted(glob.glob(os.path.join(target, "**", "*.csv"), recursive=True))
+
+    logger.info(f"Found {len(sources)} CSV files in extracted data.")
+    return sources
+
+
+@instrumented("read_csv")
+def load_fmli(sources) -> pd.DataFrame:
+    """Load the first FMLI file among `sources` (NEWID + demographics only)."""
+    fmli_path = next((f for f in sources if "fmli" in basename(f).lower()), None)
+    if not fmli_path:
+        raise FileNotFoundError("❌ Could not locate FMLI CSV file.")
+    logger.info(f"Using FMLI file: {basename(fmli_path)}")
+    return ingest.load_fmli(fmli_path)
+
+
+@instrumented("groupby")
+def aggregate_expenditures(sources, year=DEFAULT_YEAR, files=None) -> pd.DataFrame:
+    """Sum each quarterly MTBI file per NEWID and pivot them into one wide table."""
+    quarter_totals = {}
+    for fname in files or quarter_files(year):
+        fpath = next((f for f in sources if basename(f).lower() == fname.lower()), None)
+        if not fpath:
+            logger.warning(f"EXPN file not found: {fname}")
+            continue
+
+        columns = ingest.read_header(fpath)
+        logger.info(f"{fname} columns: {columns}")
+        col = ingest.find_amount_column(columns, ingest.SPENDING_COLS)
+
+        if not col or "NEWID" not in columns:
+            logger.warning(f"Skipping {fname}: missing NEWID or valid amount column")
+            continue
+
+        quarter_totals[f"spending_{fname.split('.')[0]}"] = ingest.aggregate_spending(fpath, col)
+        logger.info(f"✅ Aggregated from {fname} using column '{col}'")
+
+    if not quarter_totals:
+        raise ValueError("❌ No valid EXPN files with usable spending data.")
+    return ingest.pivot_by_quarter(quarter_totals)
+
+
+@instrumented("groupby")
+def discover_expenditures(sources, candidates=DISCOVERY_SPENDING_COLS) -> pd.DataFrame:
+    """
+    Total spending per NEWID from the first file with NEWID and a usable amount column.
+
+    Candidates come from the persisted schema index (or ZIP headers), and each is
+    parsed at most once. They are tried in basename order, so extracted files and ZIP
+    members pick the same file.
+    """
+    sources = sorted(sources, key=basename)
+    if sources and isinstance(sources[0], ZipMember):
+        found = header_candidates(sources, candidates)
+    else:
+        found = spending_candidates(build_schema_index(sources), sources, candidates)
+
+    for f, col in found:
+        try:
+            totals = ingest.aggregate_spending(f, col)
+        except Exception:
+            continue
+        if totals is not None and totals.notna().sum() > 10 and totals.sum() > 0:
+            logger.info(f"✅ Using EXPN file: {basename(f)} with column '{col}'")
+            expn_total = totals.reset_index()
+            expn_total.columns = ["NEWID", "TOTAL_SPENDING"]
+            return expn_total
+
+    raise FileNotFoundError("❌ No valid EXPN file with usable numeric spending column found.")
+
+
+@instrumented("merge")
+def build_consumer_spending(fmli: pd.DataFrame, spending: pd.DataFrame) -> pd.DataFrame:
+    """Join spending onto FMLI, add Low/Medium/High tiers and apply the output schema and labels."""
+    merged = pd.merge(fmli, spending[["NEWID", "TOTAL_SPENDING"]], on="NEWID")
+    merged = merged.dropna(subset=["TOTAL_SPENDING"])
+
+    try:
+        merged["spending_category"] = pd.qcut(
+            merged["TOTAL_SPENDING"], q=3, labels=["Low", "Medium", "High"], duplicates="drop"
+        )
+    except ValueError:
+        merged["spending_category"] = "Uncategorized"
+        logger.warning("Could not compute quantiles for TOTAL_SPENDING.")
+
+    final_df = merged[list(OUTPUT_COLUMNS)].dropna().rename(columns=OUTPUT_COLUMNS)
+    final_df["education_level"] = final_df["education_level"].map(EDUCATION_LABELS)
+    final_df["region_code"] = final_df["region_code"].map(REGION_LABELS)
+    return final_df
+
+
+def run(year=DEFAULT_YEAR, output_csv=OUTPUT_CSV, skip_download=False, mode="quarters",
+        only_needed=False, from_zip=False, mirror=None, sha256=None, cache=False,
+        data_dir=DATA_DIR, source_dir=DATA_SOURCE_DIR) -> pd.DataFrame:
+    """
+    Download -> extract -> aggregate -> build for one release; writes output_csv if given.
+
+    mode="quarters" sums the release's four MTBI files (bin/generate.py);
+    mode="discover" uses the first file with a spending column (bin/generate_consumer_spending_dataset.py).
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(source_dir, exist_ok=True)
+
+    if skip_download:
+        logger.info("Skipping download step as requested.")
+        zip_file = zip_path(year, source_dir)
+    else:
+        zip_file = download(year, source_dir, mirror=mirror, sha256=sha256)
+
+    sources = extract(year, zip_file, data_dir, only_needed=only_needed, from_zip=from_zip, cache=cache)
+    fmli = load_fmli(sources)
+    if mode == "quarters":
+        spending = aggregate_expenditures(sources, year)
+    elif mode == "discover":
+        spending = discover_expenditures(sources)
+    else:
+        raise ValueError(f"Unknown mode: {mode!r}")
+
+    final_df = build_consumer_spending(fmli, spending)
+    if output_csv:
+        final_df.to_csv(output_csv, index=False)
+        logger.info(f"🎉 {os.path.basename(output_csv)} saved to: {output_csv}")
+    return final_df
+
+
+def _build_partition(year, output_dir, run_kwargs):
+    final_df = run(year=year, output_csv=None, **run_kwargs)
+    target = partition_path(output_dir, year)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = target + ".tmp"
+    if target.endswith(".parquet"):
+        final_df.to_parquet(tmp, index=False)
+    else:
+        final_df.to_csv(tmp, index=False)
+    os.replace(tmp, target)
+    return year, len(final_df), target
+
+
+def run_years(years, output_dir=OUTPUT_DATASET_DIR, jobs=None, **run_kwargs) -> dict:
+    """
+    Build each release in its own worker process and write one partition per year.
+
+    Spending tiers are computed within each year. Extra keyword arguments go to run()
+    (mode, skip_download, only_needed, from_zip, mirror, cache, data_dir, source_dir).
+    Returns {year: partition path}; a failed year is logged and left out.
+    """
+    years = parse_years(years) if isinstance(years, str) else sorted(set(int(y) for y in years))
+    written = {}
+    with ProcessPoolExecutor(max_workers=jobs or min(len(years), os.cpu_count() or 1)) as pool:
+        futures = {pool.submit(_build_partition, year, output_dir, run_kwargs): year for year in years}
+        for future in as_completed(futures):
+            year = futures[future]
+            try:
+                _, rows, target = future.result()
+            except Exception as e:
+                logger.error(f"❌ {release_name(year)} failed: {e}")
+                continue
+            written[year] = target
+            logger.info(f"🎉 {release_name(year)}: {rows:,} rows -> {target}")
+    return dict(sorted(written.items()))
@@ -0,0 +1,115 @@
+"""
+Streaming access to the CE PUMD interview ZIP.
+
+Members are copied out in fixed-size chunks, and a member whose size and CRC-32 already match
+the file on disk is left alone. Extracted files keep the member's timestamp so the Parquet
+mirror does not see them as changed. ZipMember lets ingest read a CSV without extracting it.
+"""
+import os
+import time
+import zlib
+import shutil
+import fnmatch
+import zipfile
+import logging
+from typing import NamedTuple
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 1 << 20
+
+# Members the consumer spending build reads (flattened names, matched case-insensitively)
+PIPELINE_PATTERNS = ("fmli*.csv", "mtbi*.csv", "expn*/*.csv")
+
+
+class ZipMember(NamedTuple):
+    """A CSV inside a ZIP archive, readable by ingest without extracting it."""
+    zip_path: str
+    name: str
+
+    @property
+    def basename(self):
+        return os.path.basename(self.name)
+
+    @contextmanager
+    def open(self):
+        # ZipExtFile decompresses lazily, so pandas can stream it in chunks
+        with zipfile.ZipFile(self.zip_path) as archive, archive.open(self.name) as stream:
+            yield stream
+
+
+def basename(source):
+    """Basename for either a filesystem path or a ZipMember."""
+    return source.basename if isinstance(source, ZipMember) else os.path.basename(source)
+
+
+def flattened_name(member, root):
+    """Strip the leading '<root>/' the BLS archives wrap everything in."""
+    prefix = root.rstrip("/") + "/"
+    return member[len(prefix):] if member.startswith(prefix) else member
+
+
+def _matches(name, patterns):
+    return patterns is None or any(fnmatch.fnmatch(name.lower(), p) for p in patterns)
+
+
+def list_members(zip_path, root, patterns=None, suffix=".csv"):
+    """ZipMembers for every file in the archive whose flattened name matches `patterns`."""
+    with zipfile.ZipFile(zip_path) as archive:
+        names = [i.filename for i in archive.infolist() if not i.is_dir()]
+    return [
+        ZipMember(zip_path, name) for name in names
+        if name.lower().endswith(suffix) and _matches(flattened_name(name, root), patterns)
+    ]
+
+
+def file_crc32(path, chunk_size=COPY_CHUNK_SIZE):
+    crc = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+def is_unchanged(info: zipfile.ZipInfo, target):
+    """Size first (a stat), CRC-32 only when sizes agree."""
+    try:
+        if os.path.getsize(target) != info.file_size:
+            return False
+    except OSError:
+        return False
+    return file_crc32(target) == info.CRC
+
+
+def extract_member(archive, info, target, chunk_size=COPY_CHUNK_SIZE):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = target + ".part"
+    with archive.open(info) as source, open(tmp, "wb") as out:
+        shutil.copyfileobj(source, out, chunk_size)
+    os.replace(tmp, target)
+    mtime = time.mktime(info.date_time + (0, 0, -1))
+    os.utime(target, (mtime, mtime))
+
+
+def extract_zip(zip_path, extract_dir, root, patterns=None, chunk_size=COPY_CHUNK_SIZE):
+    """
+    Extract (and flatten) matching members into extract_dir, skipping unchanged files.
+
+    Returns a {"extracted": n, "skipped": n} summary.
+    """
+    summary = {"extracted": 0, "skipped": 0}
+    with zipfile.ZipFile(zip_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            name = flattened_name(info.filename, root)
+            if not _matches(name, patterns):
+                continue
+            target = os.path.join(extract_dir, name)
+            if is_unchanged(info, target):
+                summary["skipped"] += 1
+                continue
+            extract_member(archive, info, target, chunk_size)
+            summary["extracted"] += 1
+    return summary
@@ -1,17 +1,22 @@
+import argparse
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.pipeline import Pipeline
-from sklearn.model_selection import RandomizedSearchCV
+from sklearn.base import clone
 from sklearn.metrics import classification_report
-from data_preprocessing import load_and_split, make_preprocessor
+from data_preprocessing import load_and_split, make_pipeline
+from search_runner import STRATEGIES, ResultStore, run_search, report
 from scipy.stats import randint
 
+parser = argparse.ArgumentParser(description="Random forest hyperparameter search.")
+parser.add_argument("--strategy", choices=[s for s in STRATEGIES if s != "grid"], default="random")
+parser.add_argument("--resource", default="n_samples", help="Halving resource: n_samples or clf__n_estimators")
+parser.add_argument("--compare", action="store_true", help="Run every strategy and report time-to-best-score")
+parser.add_argument("--no-store", action="store_true", help="Ignore and don't update the persistent results store")
+args = parser.parse_args()
+
 X_train, X_test, y_train, y_test = load_and_split()
-preprocessor = make_preprocessor()
 
-pipeline = Pipeline([
-    ("prep", preprocessor),
-    ("clf", RandomForestClassifier(random_state=42))
-])
+# Preprocessing is fitted once per CV fold and shared by all candidates
+pipeline = make_pipeline(RandomForestClassifier(random_state=42))
 
 param_dist = {
     "clf__n_estimators": randint(50, 200),
@@ -20,8 +25,25 @@ param_dist = {
     "clf__criterion": ["gini", "entropy"]
 }
 
-random_search = RandomizedSearchCV(pipeline, param_distributions=param_dist, n_iter=20, cv=5, random_state=42)
-random_search.fit(X_train, y_train)
+def search(strategy, resource):
+    space, estimator = param_dist, pipeline
+    if strategy == "halving" and resource == "clf__n_estimators":
+        # n_estimators becomes the budget: grown up to 200 trees for the survivors
+        space = {k: v for k, v in param_dist.items() if k != resource}
+        estimator = clone(pipeline).set_params(clf__n_estimators=200)
+    return run_search(
+        "random_forest", estimator, space, X_train, y_train,
+        strategy=strategy, n_candidates=20, cv=5, resource=resource, random_state=42,
+        store=ResultStore(None) if args.no_store else None,
+    )
+
+if args.compare:
+    results = [search("random", None), search("halving", "n_samples"), search("halving", "clf__n_estimators")]
+    print("⏱️ Strategy comparison:\n", report(results).to_string())
+    result = max(results, key=lambda r: r.best_score)
+else:
+    result = search(args.strategy, args.resource)
 
-print("🎯 Best Parameters:", random_search.best_params_)
-print("\n📋 Classification Report:\n", classification_report(y_test, random_search.predict(X_test)))
\ No newline at end of file
+print("🎯 Best Parameters:", result.best_params)
+best_model = clone(pipeline).set_params(**result.best_params).fit(X_train, y_train)
+print("\n📋 Classification Report:\n", classification_report(y_test, best_model.predict(X_test)))
@@ -0,0 +1,109 @@
+"""
+Pick the fastest NUTS backend available on this machine, with fallbacks.
+
+Backends, in "auto" preference order:
+- nutpie    Rust NUTS over a numba-compiled logp (pip install nutpie)
+- numpyro   JAX NUTS on CPU (pip install numpyro)
+- blackjax  JAX NUTS on CPU (pip install blackjax)
+- pymc      PyMC's own NUTS over the PyTensor C backend (needs a C++ compiler)
+- python    PyMC's NUTS with PYTENSOR_FLAGS linker=py (no compiler at all)
+
+configure_pytensor() must run before pymc/pytensor are imported, since PyTensor
+reads PYTENSOR_FLAGS once at import time. An explicit PYTENSOR_FLAGS in the
+environment always wins.
+
+Compiled PyTensor modules (and nutpie's numba cache) live under <repo>/.cache/pytensor
+(PYTENSOR_COMPILE_DIR), next to the trace cache, so every script and CLI subcommand
+reuses the same warm cache across runs and container restarts.
+"""
+import os
+import shutil
+import logging
+import importlib.util
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("nutpie", "numpyro", "blackjax", "pymc", "python")
+JAX_BACKENDS = ("numpyro", "blackjax")
+PY_LINKER_FLAGS = "mode=FAST_RUN,linker=py"
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+COMPILE_DIR = os.environ.get("PYTENSOR_COMPILE_DIR", os.path.join(BASE_DIR, ".cache", "pytensor"))
+
+
+def has_cxx() -> bool:
+    return any(shutil.which(c) for c in (os.environ.get("CXX", ""), "g++", "clang++") if c)
+
+
+def _installed(module) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def available_backends() -> list:
+    found = []
+    if _installed("nutpie"):
+        found.append("nutpie")
+    if _installed("jax") and _installed("numpyro"):
+        found.append("numpyro")
+    if _installed("jax") and _installed("blackjax"):
+        found.append("blackjax")
+    if has_cxx():
+        found.append("pymc")
+    found.append("python")
+    return found
+
+
+def resolve_backend(requested="auto") -> str:
+    """Map 'auto' (or an unavailable backend) to the best one installed here."""
+    available = available_backends()
+    if requested != "auto":
+        if requested in available:
+            return requested
+        logger.warning(f"Sampler backend '{requested}' is not available here; falling back.")
+    return available[0]
+
+
+def configure_pytensor(backend="auto") -> str:
+    """Set PYTENSOR_FLAGS for `backend` before pymc is imported. Returns the resolved backend."""
+    backend = resolve_backend(backend)
+    os.environ.setdefault("NUMBA_CACHE_DIR", os.path.join(COMPILE_DIR, "numba"))
+    if "PYTENSOR_FLAGS" in os.environ:
+        return backend
+    flags = [PY_LINKER_FLAGS] if backend == "python" or not has_cxx() else []
+    os.environ["PYTENSOR_FLAGS"] = ",".join(flags + [f"base_compiledir={COMPILE_DIR}"])
+    return backend
+
+
+def default_cores(chains) -> int:
+    return max(1, min(chains, os.cpu_count() or 1))
+
+
+def sample_kwargs(backend, chains=2, cores=None) -> dict:
+    """Keyword arguments for pm.sample / bambi Model.fit that select the backend and parallel chains."""
+    kwargs = {"chains": chains, "cores": cores or default_cores(chains)}
+    if backend in ("nutpie", "numpyro", "blackjax"):
+        kwargs["nuts_sampler"] = backend
+    if backend in JAX_BACKENDS:
+        # One XLA CPU device per chain so JAX runs the chains side by side
+        kwargs["nuts_sampler_kwargs"] = {"chain_method": "parallel"}
+    return kwargs
+
+
+def sample_with_fallback(sample_fn, backend, chains=2, cores=None):
+    """
+    Call sample_fn(**sample_kwargs(backend)); if a compiled external backend fails
+    (missing JAX device, numba error, ...), retry once on PyMC's own NUTS.
+    """
+    try:
+        return sample_fn(**sample_kwargs(backend, chains, cores))
+    except Exception as e:
+        if backend in ("pymc", "python"):
+            raise
+        logger.warning(f"Sampler backend '{backend}' failed ({e}); retrying with PyMC NUTS.")
+        return sample_fn(**sample_kwargs("pymc", chains, cores))
+
+
+def enable_jax_cpu_devices(n):
+    """Expose n CPU devices to XLA; only effective before jax is first imported."""
+    flags = os.environ.get("XLA_FLAGS", "")
+    if "xla_force_host_platform_device_count" not in flags:
+        os.environ["XLA_FLAGS"] = f"{flags} --xla_force_host_platform_device_count={n}".strip()
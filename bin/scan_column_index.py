@@ -1,7 +1,25 @@
+"""
+Index every CSV under data/intrvw23 into column_index_report.csv.
+
+Files are scanned largest first in a process pool, one streaming pass each. Newlines are
+counted on the raw bytes while pandas parses the same buffers for nulls, min/max and dtypes over
+the whole file. A CSV with a fresh Parquet mirror is described from the Parquet footer alone.
+
+Usage:
+    python bin/scan_column_index.py                 # full stats, all cores
+    python bin/scan_column_index.py --rows-only     # just columns + newline row counts
+    python bin/scan_column_index.py --jobs 4
+"""
 import os
+import io
+import csv
 import glob
-import pandas as pd
+import argparse
 import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from columnar_cache import fresh_cache_path, pq
 
 # --- Configure Logging ---
 logging.basicConfig(
@@ -13,29 +31,185 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 DATA_DIR = os.path.join(BASE_DIR, "data", "intrvw23")
 OUTPUT_FILE = os.path.join(BASE_DIR, "column_index_report.csv")
 
-# --- Collect CSVs ---
-csv_paths = glob.glob(os.path.join(DATA_DIR, "**", "*.csv"), recursive=True)
-logging.info(f"Found {len(csv_paths)} CSV files under /data/intrvw23")
-
-# --- Index Collector ---
-summary = []
-
-for path in csv_paths:
-    try:
-        sample = pd.read_csv(path, nrows=5)
-        num_rows = sum(1 for _ in open(path)) - 1  # subtract header
-        coltypes = {col: str(sample[col].dtype) for col in sample.columns}
-        summary.append({
-            "file": os.path.basename(path),
-            "columns": ", ".join(sample.columns),
-            "row_count_est": num_rows,
-            "column_types": "; ".join([f"{k}:{v}" for k, v in coltypes.items()])
-        })
-    except Exception as e:
-        logging.warning(f"Could not read {os.path.basename(path)}: {e}")
-        continue
-
-# --- Save Output ---
-df = pd.DataFrame(summary)
-df.sort_values(by="file").to_csv(OUTPUT_FILE, index=False)
-logging.info(f"📋 Column summary written to: {OUTPUT_FILE}")
\ No newline at end of file
+REPORT_FIELDS = ["file", "columns", "row_count_est", "column_types", "null_counts", "min_values", "max_values"]
+BLOCK_SIZE = 8 << 20
+CHUNK_ROWS = 200_000
+
+
+# --- Row Counting ---
+class NewlineCountingReader(io.RawIOBase):
+    """Binary reader that counts newlines in each block as it is handed to the parser."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.newlines = 0
+        self.last_byte = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._raw.readinto(b)
+        if n:
+            block = bytes(b[:n])
+            self.newlines += block.count(b"\n")
+            self.last_byte = block[-1:]
+        return n
+
+
+def _rows_from_newlines(newlines, last_byte):
+    # A final line without a trailing newline still counts; the header never does
+    lines = newlines + (1 if last_byte not in (b"", b"\n") else 0)
+    return max(lines - 1, 0)
+
+
+def count_rows(path, block_size=BLOCK_SIZE):
+    """Count data rows by scanning newlines in a reused binary buffer."""
+    buf = bytearray(block_size)
+    newlines, last_byte = 0, b""
+    with open(path, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            newlines += buf.count(b"\n", 0, n)
+            last_byte = bytes(buf[n - 1:n])
+    return _rows_from_newlines(newlines, last_byte)
+
+
+# --- Column Statistics ---
+def _is_numeric(dtype):
+    return dtype is not None and dtype.kind in "biuf"
+
+
+def _promote(current, new):
+    if current is None:
+        return new
+    if _is_numeric(current) and _is_numeric(new):
+        return np.result_type(current, new)
+    return np.dtype("O")
+
+
+def _scalar(value):
+    return value.item() if hasattr(value, "item") else value
+
+
+def _fmt(values: dict):
+    return "; ".join(f"{k}:{v}" for k, v in values.items())
+
+
+def _stats_row(path, columns, rows, dtypes, nulls, mins, maxs):
+    numeric = [c for c in columns if _is_numeric(dtypes.get(c)) and c in mins]
+    return {
+        "file": os.path.basename(path),
+        "columns": ", ".join(columns),
+        "row_count_est": rows,
+        "column_types": _fmt({c: str(dtypes[c]) for c in columns}),
+        "null_counts": _fmt({c: int(nulls.get(c, 0)) for c in columns}),
+        "min_values": _fmt({c: _scalar(mins[c]) for c in numeric}),
+        "max_values": _fmt({c: _scalar(maxs[c]) for c in numeric}),
+    }
+
+
+def describe_csv(path, chunk_rows=CHUNK_ROWS):
+    """Row count, full-file dtypes, null counts and numeric min/max in one pass over the bytes."""
+    dtypes, mins, maxs = {}, {}, {}
+    nulls = pd.Series(dtype="int64")
+    columns = []
+    with open(path, "rb", buffering=0) as raw:
+        counter = NewlineCountingReader(raw)
+        stream = io.BufferedReader(counter, buffer_size=BLOCK_SIZE)
+        with pd.read_csv(stream, chunksize=chunk_rows, low_memory=False) as reader:
+            for chunk in reader:
+                columns = chunk.columns.tolist()
+                nulls = nulls.add(chunk.isna().sum(), fill_value=0)
+                for col in columns:
+                    series = chunk[col]
+                    dtypes[col] = _promote(dtypes.get(col), series.dtype)
+                    if not _is_numeric(series.dtype) or series.isna().all():
+                        continue
+                    lo, hi = series.min(), series.max()
+                    mins[col] = lo if col not in mins else min(mins[col], lo)
+                    maxs[col] = hi if col not in maxs else max(maxs[col], hi)
+    if not columns:
+        columns = pd.read_csv(path, nrows=0).columns.tolist()
+        dtypes = {c: np.dtype("O") for c in columns}
+    rows = _rows_from_newlines(counter.newlines, counter.last_byte)
+    return _stats_row(path, columns, rows, dtypes, nulls, mins, maxs)
+
+
+def describe_cached(path, parquet_path):
+    """Same stats from the Parquet footer: row-group null counts and min/max, no data pages read."""
+    pf = pq.ParquetFile(parquet_path, memory_map=True)
+    meta = pf.metadata
+    dtypes = pf.schema_arrow.empty_table().to_pandas().dtypes.to_dict()
+    columns = list(dtypes)
+    nulls, mins, maxs = {}, {}, {}
+    for rg in range(meta.num_row_groups):
+        group = meta.row_group(rg)
+        for i in range(group.num_columns):
+            chunk = group.column(i)
+            col = chunk.path_in_schema
+            stats = chunk.statistics
+            if stats is None:
+                continue
+            nulls[col] = nulls.get(col, 0) + stats.null_count
+            if stats.has_min_max and _is_numeric(dtypes.get(col)):
+                mins[col] = stats.min if col not in mins else min(mins[col], stats.min)
+                maxs[col] = stats.max if col not in maxs else max(maxs[col], stats.max)
+    return _stats_row(path, columns, meta.num_rows, dtypes, nulls, mins, maxs)
+
+
+def describe_rows_only(path):
+    columns = pd.read_csv(path, nrows=0).columns.tolist()
+    return {"file": os.path.basename(path), "columns": ", ".join(columns), "row_count_est": count_rows(path)}
+
+
+def describe(path, rows_only=False):
+    if rows_only:
+        return describe_rows_only(path)
+    cached = fresh_cache_path(path)
+    return describe_cached(path, cached) if cached else describe_csv(path)
+
+
+# --- Scan ---
+def scan(csv_paths, output_file=OUTPUT_FILE, jobs=None, rows_only=False):
+    # Largest files first so one big file doesn't start last and hold up the pool
+    csv_paths = sorted(csv_paths, key=os.path.getsize, reverse=True)
+    partial = output_file + ".partial"
+    written = 0
+
+    with open(partial, "w", newline="") as out, ProcessPoolExecutor(max_workers=jobs) as pool:
+        writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        futures = {pool.submit(describe, path, rows_only): path for path in csv_paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                writer.writerow(future.result())
+            except Exception as e:
+                logging.warning(f"Could not read {os.path.basename(path)}: {e}")
+                continue
+            out.flush()
+            written += 1
+
+    df = pd.read_csv(partial, dtype=str, keep_default_na=False)
+    df.sort_values(by="file").to_csv(output_file, index=False)
+    os.remove(partial)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index columns, row counts and stats of the extracted PUMD CSVs.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory to scan recursively for CSVs")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Report CSV to write")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--rows-only", action="store_true", help="Skip stats; only columns and newline row counts")
+    args = parser.parse_args()
+
+    # --- Collect CSVs ---
+    csv_paths = glob.glob(os.path.join(args.data_dir, "**", "*.csv"), recursive=True)
+    logging.info(f"Found {len(csv_paths)} CSV files under {os.path.relpath(args.data_dir, BASE_DIR)}")
+
+    written = scan(csv_paths, args.output, jobs=args.jobs, rows_only=args.rows_only)
+    logging.info(f"📋 Column summary for {written} files written to: {args.output}")
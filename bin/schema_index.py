@@ -0,0 +1,110 @@
+"""
+Persisted header index of the extracted CE PUMD CSVs (data/schema_index.json).
+
+Each entry has a file's columns, dtypes, whether it has NEWID and its amount-column candidates.
+Entries are keyed on size and mtime, so only new or changed files are probed again. This turns
+"find a file with a spending column" into a lookup instead of a parse of every CSV.
+"""
+import os
+import json
+import fcntl
+import logging
+import tempfile
+import pandas as pd
+from ingest import SPENDING_COLS, read_header
+from columnar_cache import DATA_DIR, fresh_cache_path, pq
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_INDEX_PATH = os.path.join(DATA_DIR, "schema_index.json")
+DTYPE_SAMPLE_ROWS = 1000
+
+
+def _key(path, data_dir=DATA_DIR):
+    return os.path.relpath(os.path.abspath(path), data_dir)
+
+
+def probe(path) -> dict:
+    """Describe one CSV from its header (and Parquet footer or a row sample for dtypes)."""
+    st = os.stat(path)
+    cached = fresh_cache_path(path)
+    if cached:
+        dtypes = pq.read_schema(cached).empty_table().to_pandas().dtypes
+    else:
+        dtypes = pd.read_csv(path, nrows=DTYPE_SAMPLE_ROWS).dtypes
+    columns = dtypes.index.tolist()
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "columns": columns,
+        "dtypes": {col: str(dtype) for col, dtype in dtypes.items()},
+        "has_newid": "NEWID" in columns,
+        "amount_columns": [c for c in columns if c.upper() in SPENDING_COLS],
+    }
+
+
+def load_index(index_path=SCHEMA_INDEX_PATH) -> dict:
+    try:
+        with open(index_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index, index_path=SCHEMA_INDEX_PATH):
+    # A private temp file per writer: parallel run_years workers may save at the same time
+    directory = os.path.dirname(index_path)
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=directory, prefix=".schema_index.", suffix=".tmp", delete=False) as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    try:
+        os.replace(f.name, index_path)
+    except OSError:
+        os.remove(f.name)
+        raise
+
+
+def build_schema_index(paths, index_path=SCHEMA_INDEX_PATH) -> dict:
+    """Update the persisted index for `paths`, re-probing only files whose size or mtime moved."""
+    index = load_index(index_path)
+    probed = {}
+    for path in paths:
+        key = _key(path)
+        st = os.stat(path)
+        entry = index.get(key)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            continue
+        try:
+            index[key] = probed[key] = probe(path)
+        except Exception as e:
+            logger.warning(f"Could not probe {os.path.basename(path)}: {e}")
+    if probed:
+        # Merge into what is on disk now, under a lock, so entries saved by parallel workers are kept
+        with open(index_path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = load_index(index_path)
+            merged.update(probed)
+            save_index(merged, index_path)
+        index.update(merged)
+    logger.info(f"Schema index: {len(probed)} probed, {len(paths) - len(probed)} reused")
+    return index
+
+
+def spending_candidates(index, paths, candidates=SPENDING_COLS):
+    """Yield (path, amount_col) for files with NEWID and an amount column, in `paths` order."""
+    for path in paths:
+        entry = index.get(_key(path))
+        if not entry or not entry["has_newid"]:
+            continue
+        col = next((c for c in entry["amount_columns"] if c.upper() in candidates), None)
+        if col:
+            yield path, col
+
+
+def header_candidates(sources, candidates=SPENDING_COLS):
+    """Unindexed variant for ZIP members: same selection, from each header read on the fly."""
+    for source in sources:
+        columns = read_header(source)
+        col = next((c for c in columns if c.upper() in candidates), None)
+        if col and "NEWID" in columns:
+            yield source, col
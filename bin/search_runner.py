@@ -0,0 +1,206 @@
+"""
+Grid, random and successive-halving search for the sklearn scripts, with a persistent store.
+
+Halving can budget on training rows ("n_samples") or on an estimator parameter such as
+clf__n_estimators. Candidates run in parallel and each result is appended to a JSONL store as it
+finishes. The key covers the params, CV setup, data, pipeline definition and sklearn version,
+so a later run only evaluates what it hasn't seen.
+
+    result = run_search("random_forest", pipeline, param_dist, X_train, y_train, strategy="halving")
+"""
+import os
+import json
+import time
+import hashlib
+import datetime
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, clone
+from instrument import instrumented
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold, cross_val_score
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STORE_PATH = os.path.join(BASE_DIR, ".cache", "search", "results.jsonl")
+STRATEGIES = ("grid", "random", "halving")
+DEFAULT_ETA = 3
+
+
+class SearchResult(NamedTuple):
+    strategy: str
+    best_params: dict
+    best_score: float
+    time_to_best: float
+    total_time: float
+    evaluated: int
+    reused: int
+    # Original fit time of the results taken from the store (not part of total_time)
+    reused_seconds: float = 0.0
+
+
+class ResultStore:
+    """Append-only JSONL of finished evaluations, indexed by key in memory."""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.records = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.records[record["key"]] = record
+
+    def get(self, key):
+        return self.records.get(key)
+
+    def put(self, record):
+        self.records[record["key"]] = record
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def data_fingerprint(X, y) -> str:
+    digest = hashlib.sha256()
+    for part in (X, y):
+        digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def estimator_fingerprint(estimator) -> str:
+    """sha256 over every (deep) parameter of the estimator or pipeline and the sklearn version."""
+    params = {
+        k: type(v).__name__ if isinstance(v, BaseEstimator) else repr(v)  # sub-estimators' params are listed too
+        for k, v in estimator.get_params(deep=True).items()
+    }
+    payload = {"estimator": type(estimator).__name__, "params": params, "sklearn": sklearn.__version__}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def evaluation_key(name, params, resource, cv, fingerprint, model="") -> str:
+    payload = {"name": name, "params": params, "resource": resource, "cv": cv, "data": fingerprint, "model": model}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _evaluate(estimator, params, X, y, cv, resource_name, resource):
+    model = clone(estimator).set_params(**params)
+    if resource_name == "n_samples":
+        # Prefixes of one fixed permutation, so each round's rows contain the previous round's;
+        # kept in original order, so the full-size round uses the same CV folds as a plain search
+        order = np.sort(np.random.default_rng(0).permutation(len(X))[:resource])
+        X, y = X.iloc[order], y.iloc[order]
+    elif resource_name:
+        model.set_params(**{resource_name: resource})
+    start = time.perf_counter()
+    scores = cross_val_score(model, X, y, cv=StratifiedKFold(cv), n_jobs=1)
+    return float(scores.mean()), time.perf_counter() - start
+
+
+def _evaluate_task(key, params, estimator, X, y, cv, resource_name, resource):
+    return (key, params, *_evaluate(estimator, params, X, y, cv, resource_name, resource))
+
+
+def candidates(space, strategy, n_candidates, random_state=42) -> list:
+    # Halving over an all-list space starts from the full grid
+    exhaustive = all(isinstance(v, (list, tuple)) for v in space.values())
+    if strategy == "grid" or (strategy == "halving" and exhaustive):
+        params = list(ParameterGrid(space))
+    else:
+        params = list(ParameterSampler(space, n_iter=n_candidates, random_state=random_state))
+    return [{k: _plain(v) for k, v in p.items()} for p in params]
+
+
+def halving_schedule(n_candidates, min_resource, max_resource, eta=DEFAULT_ETA) -> list:
+    """[(n_candidates, resource), ...] for each round, ending at max_resource."""
+    # 1 + floor(log_eta(n_candidates)), in integers: math.log(243, 3) is 4.999...
+    rounds = 1
+    while eta ** rounds <= n_candidates:
+        rounds += 1
+    schedule = []
+    for i in range(rounds):
+        resource = max(min_resource, int(max_resource // eta ** (rounds - 1 - i)))
+        schedule.append((max(1, -(-n_candidates // eta ** i)), resource))
+    return schedule
+
+
+@instrumented("search_fit", rows=None)
+def run_search(name, estimator, space, X, y, strategy="random", n_candidates=20, cv=5,
+               resource="n_samples", min_resource=None, max_resource=None, eta=DEFAULT_ETA,
+               n_jobs=-1, random_state=42, store=None) -> SearchResult:
+    """Run one search strategy, reusing every evaluation already in `store`."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy!r}; choose from {STRATEGIES}")
+    store = store if store is not None else ResultStore()
+    fingerprint = data_fingerprint(X, y)
+    model = estimator_fingerprint(estimator)
+    pool = candidates(space, strategy, n_candidates, random_state)
+
+    if strategy == "halving":
+        if resource != "n_samples" and resource in next(iter(pool), {}):
+            raise ValueError(f"{resource} is the halving resource; remove it from the search space")
+        if max_resource is None:
+            max_resource = len(X) if resource == "n_samples" else estimator.get_params()[resource]
+        if min_resource is None:
+            min_resource = cv * 20 if resource == "n_samples" else 10
+        schedule = halving_schedule(len(pool), min_resource, max_resource, eta)
+    else:
+        resource, schedule = None, [(len(pool), None)]
+
+    start = time.perf_counter()
+    evaluated = reused = 0
+    # Reused results are charged their stored fit time, so a resumed search's time_to_best isn't 0
+    reused_seconds = 0.0
+    with Parallel(n_jobs=n_jobs, return_as="generator_unordered") as parallel:
+        for round_size, amount in schedule:
+            pool = pool[:round_size]
+            keys = [evaluation_key(name, p, [resource, amount], cv, fingerprint, model) for p in pool]
+            scores, finished = {}, {}
+            todo = []
+            for key, params in zip(keys, pool):
+                if store.get(key):
+                    reused_seconds += store.get(key).get("fit_seconds", 0.0)
+                    scores[key] = store.get(key)["score"]
+                    finished[key] = time.perf_counter() - start + reused_seconds
+                    reused += 1
+                else:
+                    todo.append((key, params))
+
+            tasks = (delayed(_evaluate_task)(k, p, estimator, X, y, cv, resource, amount) for k, p in todo)
+            for key, params, score, seconds in parallel(tasks):
+                scores[key], finished[key] = score, time.perf_counter() - start + reused_seconds
+                evaluated += 1
+                store.put({
+                    "key": key, "name": name, "params": params, "resource": resource, "amount": amount,
+                    "score": score, "fit_seconds": round(seconds, 3),
+                    "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                })
+
+            # Best first (ties keep candidate order, as in sklearn); the top ones go to the next round
+            ranked = sorted(zip(keys, pool), key=lambda kp: -scores[kp[0]])
+            pool = [params for _, params in ranked]
+
+    best_key, best_params = ranked[0]
+    best_score = scores[best_key]
+    # First moment any final-round candidate reached the winning score
+    time_to_best = min(finished[k] for k in keys if scores[k] == best_score)
+
+    best_params = dict(best_params)
+    if strategy == "halving" and resource != "n_samples":
+        best_params[resource] = schedule[-1][1]
+    label = f"{strategy}[{resource}]" if strategy == "halving" else strategy
+    return SearchResult(label, best_params, best_score, time_to_best, time.perf_counter() - start, evaluated, reused,
+                        reused_seconds)
+
+
+def report(results) -> pd.DataFrame:
+    table = pd.DataFrame([r._asdict() for r in results]).set_index("strategy")
+    return table[["best_score", "time_to_best", "total_time", "evaluated", "reused", "reused_seconds", "best_params"]]
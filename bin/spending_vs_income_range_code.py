@@ -3,26 +3,52 @@ Use Case: Spending vs Income Range Code
 Suppose you want to model how annual spending depends on income bracket.
 
 """
+import inspect
 import pymc as pm
-import pandas as pd
 import numpy as np
+from columnar_cache import read_csv_cached
+from trace_cache import cached_sample
+from scoring import fit_standardization, standardize, save_model
 
 # Load & clean
-df = pd.read_csv("data/consumer_spending.csv").dropna(subset=["total_annual_spending", "income_range_code"])
-df["income_std"] = (df["income_range_code"] - df["income_range_code"].mean()) / df["income_range_code"].std()
+df = read_csv_cached(
+    "data/consumer_spending.csv", columns=["total_annual_spending", "income_range_code"]
+).dropna(subset=["total_annual_spending", "income_range_code"])
+# Standardization is stored with the trace so scoring.py scores new households on the same scale
+standardization = fit_standardization(df["income_range_code"])
+df["income_std"] = standardize(df["income_range_code"], standardization)
 y = np.log1p(df["total_annual_spending"].values)
 x = df["income_std"].values
 
-with pm.Model() as model:
-    # --- Joint: define prior for both slope & intercept
-    alpha = pm.Normal("alpha", mu=0, sigma=10)   # intercept
-    beta = pm.Normal("beta", mu=0, sigma=1)      # slope
-    sigma = pm.HalfNormal("sigma", sigma=1)
+def build_model(x, y):
+    with pm.Model() as model:
+        # --- Joint: define prior for both slope & intercept
+        alpha = pm.Normal("alpha", mu=0, sigma=10)   # intercept
+        beta = pm.Normal("beta", mu=0, sigma=1)      # slope
+        sigma = pm.HalfNormal("sigma", sigma=1)
 
-    # --- Conditional: mean depends on income
-    mu = alpha + beta * x
+        # --- Conditional: mean depends on income
+        mu = alpha + beta * x
 
-    # --- Observed spending
-    spending = pm.Normal("spending", mu=mu, sigma=sigma, observed=y)
+        # --- Observed spending
+        spending = pm.Normal("spending", mu=mu, sigma=sigma, observed=y)
+    return model
 
-    trace = pm.sample(2000, tune=1000, return_inferencedata=True)
\ No newline at end of file
+model = build_model(x, y)
+RANDOM_SEED = 42
+
+def sample():
+    with model:
+        return pm.sample(2000, tune=1000, return_inferencedata=True, random_seed=RANDOM_SEED)
+
+# Memoized on (x, y, model source, sampler settings, seed)
+trace = cached_sample(
+    sample,
+    arrays={"x": x, "y": y},
+    model=inspect.getsource(build_model),
+    sampler={"draws": 2000, "tune": 1000},
+    seed=RANDOM_SEED,
+)
+
+# Persist the posterior for scoring.py
+save_model(trace, standardization)
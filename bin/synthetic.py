@@ -0,0 +1,428 @@
+"""
+Synthetic CE-like files at any scale, for load-testing generate.py, the pipeline and the models.
+
+`fit` learns a profile from real files. For each column it records the missing rate and a
+marginal: frequencies for codes, a quantile grid for amounts. Within a file, a Gaussian copula
+captures how the columns move together. It also records how many rows each unit has per file.
+Files listed in column_index_report.csv but absent from disk are profiled from the report alone.
+`generate` streams CSV or Parquet in chunks for any number of NEWIDs, spread over interview
+quarters like a real release. Files are linked only by NEWID.
+
+Usage:
+    python bin/synthetic.py fit data/intrvw23 data/consumer_spending.csv
+    python bin/synthetic.py generate --units 20000000 --output data_synthetic --format parquet
+    python bin/synthetic.py generate --scale 100 --files fmli232.csv mtbi232.csv
+"""
+import os
+import re
+import json
+import glob
+import time
+import fnmatch
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+from scipy.stats import poisson
+from columnar_cache import read_csv_cached, pq
+from ingest import SPENDING_COLS
+from pumd_zip import PIPELINE_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+REPORT_PATH = os.path.join(BASE_DIR, "column_index_report.csv")
+PROFILE_PATH = os.path.join(BASE_DIR, ".cache", "synthetic", "profile.json")
+OUTPUT_DIR = os.path.join(BASE_DIR, "data_synthetic")
+
+ID_COLUMNS = ("NEWID", "consumer_unit_id")
+NEWID_START = 10 ** 8  # beyond the 7-digit CE NEWIDs, so synthetic units never collide with real ones
+MAX_LEVELS = 50  # numeric columns with at most this many distinct values are treated as codes
+N_QUANTILES = 201
+FIT_SAMPLE_ROWS = 200_000  # rows used for the copula correlation; marginals use every row
+CHUNK_ELEMENTS = 1 << 23  # rows x columns per generated chunk
+QUARTERLY_FILE = re.compile(r"^[a-z]+\d{3}\.csv$")  # fmli232.csv, mtbi241.csv; not apa23.csv or fpar2223.csv
+
+
+# --- Schema report ---
+def _parse_stats(text):
+    if not isinstance(text, str) or not text:
+        return {}
+    pairs = (item.split(":", 1) for item in text.split("; ") if ":" in item)
+    return {k.strip(): v.strip() for k, v in pairs}
+
+
+def load_report(path=REPORT_PATH) -> dict:
+    """{file: {"columns", "rows", "types", and "nulls" / "min" / "max" when scanned with full stats}}."""
+    if not os.path.exists(path):
+        return {}
+    report = {}
+    for row in pd.read_csv(path).to_dict("records"):
+        report[row["file"]] = {
+            "columns": [c.strip() for c in row["columns"].split(",")],
+            "rows": int(row["row_count_est"]),
+            "types": _parse_stats(row.get("column_types")),
+            "nulls": _parse_stats(row.get("null_counts")),
+            "min": _parse_stats(row.get("min_values")),
+            "max": _parse_stats(row.get("max_values")),
+        }
+    return report
+
+
+# --- Fitting ---
+def _plain(values) -> list:
+    return [v.item() if isinstance(v, np.generic) else v for v in values]
+
+
+def _fit_column(s: pd.Series) -> dict:
+    values = s.dropna()
+    missing = 1 - len(values) / len(s) if len(s) else 0.0
+    integer = pd.api.types.is_integer_dtype(s) or (
+        pd.api.types.is_float_dtype(s) and len(values) > 0 and bool((values == values.round()).all())
+    )
+    dtype = "object" if s.dtype == object else ("int64" if integer else "float64")
+    counts = values.value_counts()
+    if dtype == "object" or len(counts) <= MAX_LEVELS:
+        counts = counts.sort_index(key=lambda idx: idx.astype(str)) if dtype == "object" else counts.sort_index()
+        return {"kind": "codes", "dtype": dtype, "missing": missing,
+                "levels": _plain(counts.index), "probs": (counts / counts.sum()).tolist()}
+    quantiles = np.quantile(values.to_numpy(dtype="float64"), np.linspace(0, 1, N_QUANTILES))
+    return {"kind": "quantiles", "dtype": dtype, "missing": missing, "quantiles": quantiles.tolist()}
+
+
+def _normal_scores(s: pd.Series, marginal) -> np.ndarray:
+    # Missing values rank lowest, matching where generation puts the missing mass
+    if marginal["kind"] == "codes":
+        keys = pd.Categorical(s, categories=marginal["levels"]).codes.astype("float64")
+    else:
+        keys = s.to_numpy(dtype="float64", na_value=-np.inf)
+    ranks = pd.Series(keys).rank(method="average").to_numpy()
+    return ndtri(ranks / (len(ranks) + 1))
+
+
+def _correlation(z: np.ndarray) -> np.ndarray:
+    """Correlation of normal scores, repaired to be positive definite; constant columns are independent."""
+    std = z.std(axis=0)
+    varying = std > 0
+    corr = np.eye(z.shape[1])
+    if varying.sum() > 1:
+        corr[np.ix_(varying, varying)] = np.corrcoef(z[:, varying], rowvar=False)
+    eigval, eigvec = np.linalg.eigh(corr)
+    corr = (eigvec * np.clip(eigval, 1e-6, None)) @ eigvec.T
+    d = np.sqrt(np.diag(corr))
+    return corr / d[:, None] / d[None, :]
+
+
+def _rows_per_unit(counts: pd.Series) -> dict:
+    freq = counts.value_counts().sort_index()
+    return {"values": _plain(freq.index), "probs": (freq / freq.sum()).tolist()}
+
+
+def fit_file(path, report_entry=None, seed=0):
+    """Profile one CSV. Returns (profile, the file's NEWIDs)."""
+    df = read_csv_cached(path, build=False)
+    name = os.path.basename(path)
+    if report_entry and report_entry["columns"] != df.columns.tolist():
+        logger.warning(f"⚠️ {name}: columns differ from column_index_report.csv; profiling the file as it is")
+
+    key = next((c for c in ID_COLUMNS if c in df.columns), None)
+    value_cols = [c for c in df.columns if c != key]
+    marginals = {c: _fit_column(df[c]) for c in value_cols}
+
+    sample = df if len(df) <= FIT_SAMPLE_ROWS else df.sample(FIT_SAMPLE_ROWS, random_state=seed)
+    z = np.column_stack([_normal_scores(sample[c], marginals[c]) for c in value_cols]) if value_cols else np.empty((len(sample), 0))
+
+    ids = df[key].dropna().to_numpy(dtype="int64") if key else np.array([], dtype="int64")
+    profile = {
+        "columns": df.columns.tolist(),
+        "key": key,
+        "source": "data",
+        "rows": int(len(df)),
+        "units": int(len(np.unique(ids))) if key else int(len(df)),
+        "rows_per_unit": _rows_per_unit(df.groupby(key).size()) if key else {"values": [1], "probs": [1.0]},
+        "marginals": marginals,
+        "corr": np.round(_correlation(z), 6).tolist(),
+    }
+    return profile, ids
+
+
+def _report_column(column, entry) -> dict:
+    """Marginal from the schema report alone: uniform between the scanned min and max, else a dtype default."""
+    dtype = entry["types"].get(column, "float64")
+    dtype = dtype if dtype in ("int64", "float64", "object") else "object"
+    rows = max(entry["rows"], 1)
+    missing = min(float(entry["nulls"].get(column, 0) or 0) / rows, 1.0)
+    low, high = entry["min"].get(column), entry["max"].get(column)
+
+    if dtype == "object":
+        levels = sorted({v for v in (low, high) if v}) or ["D"]  # CE flag "D": valid data value
+        return {"kind": "codes", "dtype": dtype, "missing": missing, "levels": levels, "probs": [1 / len(levels)] * len(levels)}
+    if low is not None and high is not None:
+        quantiles = np.linspace(float(low), float(high), N_QUANTILES)
+    elif column.upper() in SPENDING_COLS:
+        # Amounts: log-normal with a median of 50
+        grid = np.linspace(0.001, 0.999, N_QUANTILES)
+        quantiles = np.exp(np.log(50) + 1.5 * ndtri(grid))
+    else:
+        return {"kind": "codes", "dtype": dtype, "missing": missing, "levels": list(range(1, 10)), "probs": [1 / 9] * 9}
+    return {"kind": "quantiles", "dtype": dtype, "missing": missing, "quantiles": quantiles.tolist()}
+
+
+def report_file(entry, units) -> dict:
+    """Profile of a file known only from the schema report, with its rows spread over `units` eligible units."""
+    key = next((c for c in ID_COLUMNS if c in entry["columns"]), None)
+    rate = entry["rows"] / max(units, 1)
+    if rate <= 1:
+        coverage, per_unit = rate, {"values": [1], "probs": [1.0]}
+    else:
+        # 1 + Poisson(rate - 1) rows per unit, truncated where the tail is negligible
+        k = np.arange(0, int(poisson.ppf(0.9999, rate - 1)) + 1)
+        pmf = poisson.pmf(k, rate - 1)
+        coverage, per_unit = 1.0, {"values": (k + 1).tolist(), "probs": (pmf / pmf.sum()).tolist()}
+    value_cols = [c for c in entry["columns"] if c != key]
+    return {
+        "columns": entry["columns"],
+        "key": key,
+        "source": "report",
+        "rows": entry["rows"],
+        "coverage": coverage,
+        "rows_per_unit": per_unit,
+        "marginals": {c: _report_column(c, entry) for c in value_cols},
+        "corr": np.eye(len(value_cols)).tolist(),
+    }
+
+
+def _matches(relpath, patterns):
+    return any(fnmatch.fnmatch(relpath.lower(), p) or fnmatch.fnmatch(os.path.basename(relpath).lower(), p) for p in patterns)
+
+
+def _discover(paths, patterns):
+    """[(relative output name, path)] for CSVs given directly or found under directories."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for f in sorted(glob.glob(os.path.join(path, "**", "*.csv"), recursive=True)):
+                rel = os.path.relpath(f, path)
+                if patterns is None or _matches(rel, patterns):
+                    found.append((rel, f))
+        else:
+            found.append((os.path.basename(path), path))
+    return found
+
+
+def fit(paths, patterns=PIPELINE_PATTERNS, report_path=REPORT_PATH, seed=0) -> dict:
+    """
+    Profile every matching CSV under `paths`, then add the report's matching files that
+    are not on disk, profiled from the report alone.
+    """
+    report = load_report(report_path)
+    files, universe, quarterly_units = {}, set(), []
+    for rel, path in _discover(paths, patterns):
+        start = time.perf_counter()
+        files[rel], ids = fit_file(path, report.get(os.path.basename(rel)), seed)
+        universe.update(ids.tolist())
+        if QUARTERLY_FILE.match(os.path.basename(rel)):
+            quarterly_units.append(files[rel]["units"])
+        logger.info(f"📐 {rel}: {files[rel]['rows']:,} rows, {len(files[rel]['columns'])} columns ({time.perf_counter() - start:.1f}s)")
+
+    # Interview quarters of the release: every quarterly file name, on disk or in the report
+    fitted_names = {os.path.basename(rel) for rel in files}
+    quarters = sorted({name[-5:-4] for name in fitted_names | set(report) if QUARTERLY_FILE.match(name)})
+    n_quarters = max(len(quarters), 1)
+
+    # Consumer units in the release: FMLI has one row per unit, else the NEWIDs seen on disk
+    fmli_rows = sum(e["rows"] for name, e in report.items() if name.lower().startswith("fmli"))
+    units = len(universe) or fmli_rows or max((e["rows"] for e in report.values()), default=0)
+
+    for rel, profile in files.items():
+        eligible = units / n_quarters if QUARTERLY_FILE.match(os.path.basename(rel)) else units
+        profile["coverage"] = min(profile["units"] / eligible, 1.0) if eligible else 1.0
+
+    for name, entry in report.items():
+        if name in fitted_names or (patterns is not None and not _matches(name, patterns)):
+            continue
+        eligible = units / n_quarters if QUARTERLY_FILE.match(name) else units
+        files[name] = report_file(entry, eligible)
+        logger.warning(f"⚠️ {name} is not on disk; profiled from column_index_report.csv only")
+
+    return {"units": int(units), "quarters": quarters, "files": files}
+
+
+def save_profile(profile, path=PROFILE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(profile, f)
+    os.replace(tmp, path)
+    return path
+
+
+def load_profile(path=PROFILE_PATH) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+# --- Generation ---
+class FileSampler:
+    """Vectorized draws of one file's rows from its profile."""
+
+    def __init__(self, name, profile, quarters):
+        self.name = name
+        self.profile = profile
+        self.key = profile["key"]
+        self.value_cols = [c for c in profile["columns"] if c != self.key]
+        # Symmetric square root rather than Cholesky: still valid if rounding left the matrix semi-definite
+        eigval, eigvec = np.linalg.eigh(np.asarray(profile["corr"], dtype="float64").reshape(len(self.value_cols), len(self.value_cols)))
+        self.factor = eigvec * np.sqrt(np.clip(eigval, 0, None))
+        self.counts = np.asarray(profile["rows_per_unit"]["values"], dtype="int64")
+        self.count_cdf = np.cumsum(profile["rows_per_unit"]["probs"])
+        self.mean_count = float(np.dot(self.counts, profile["rows_per_unit"]["probs"]))
+        # Quarterly files only hold units interviewed in their quarter
+        self.quarter = quarters.index(name[-5:-4]) if QUARTERLY_FILE.match(os.path.basename(name)) else None
+        self.n_quarters = max(len(quarters), 1)
+        self.levels = {}
+        for c in self.value_cols:
+            m = profile["marginals"][c]
+            if m["kind"] == "codes":
+                self.levels[c] = (np.array(m["levels"], dtype=object if m["dtype"] == "object" else None), np.cumsum(m["probs"]))
+
+    def units_per_chunk(self, chunk_elements=CHUNK_ELEMENTS) -> int:
+        rows_per_unit = self.profile["coverage"] * self.mean_count / (self.n_quarters if self.quarter is not None else 1)
+        return max(1, int(chunk_elements / max(len(self.profile["columns"]) * rows_per_unit, 1e-9)))
+
+    def _column(self, c, u):
+        m = self.profile["marginals"][c]
+        missing = u < m["missing"]
+        u = (u - m["missing"]) / max(1 - m["missing"], 1e-12)
+        if m["missing"] >= 1:
+            values = np.zeros(len(u))
+        elif m["kind"] == "codes":
+            levels, cdf = self.levels[c]
+            values = levels[np.minimum(np.searchsorted(cdf, u, side="right"), len(levels) - 1)]
+        else:
+            q = m["quantiles"]
+            values = np.interp(u, np.linspace(0, 1, len(q)), q)
+            if m["dtype"] == "int64":
+                values = np.round(values)
+        if m["dtype"] == "object":
+            values = values.astype(str).astype(object)  # text, as in the source CSV
+            values[missing] = None
+            return values
+        values = values.astype("float64")
+        values[missing] = np.nan
+        if m["dtype"] == "int64":
+            return pd.array(values, dtype="Int64") if missing.any() else values.astype("int64")
+        return values
+
+    def arrow_schema(self):
+        """Parquet schema from the profile dtypes, so no chunk's values decide a column's type."""
+        import pyarrow as pa
+
+        types = {"object": pa.string(), "int64": pa.int64(), "float64": pa.float64()}
+        return pa.schema([
+            pa.field(c, pa.int64() if c == self.key else types[self.profile["marginals"][c]["dtype"]])
+            for c in self.profile["columns"]
+        ])
+
+    def sample(self, unit_start, unit_stop, rng) -> pd.DataFrame:
+        """Rows for units [unit_start, unit_stop): membership, rows per unit, then the copula draw."""
+        units = np.arange(unit_start, unit_stop, dtype="int64")
+        member = rng.random(len(units)) < self.profile["coverage"]
+        if self.quarter is not None:
+            member &= units % self.n_quarters == self.quarter
+        units = units[member]
+        counts = self.counts[np.minimum(np.searchsorted(self.count_cdf, rng.random(len(units)), side="right"), len(self.counts) - 1)]
+        ids = np.repeat(units + NEWID_START, counts)
+
+        columns = {}
+        if self.value_cols:
+            u = ndtr(rng.standard_normal((len(ids), len(self.value_cols))) @ self.factor.T)
+            columns = {c: self._column(c, u[:, j]) for j, c in enumerate(self.value_cols)}
+        if self.key:
+            columns[self.key] = ids
+        return pd.DataFrame(columns, index=pd.RangeIndex(len(ids)))[self.profile["columns"]]
+
+
+class ChunkWriter:
+    """Appends DataFrame chunks to one CSV or Parquet file."""
+
+    def __init__(self, path, fmt, schema=None):
+        self.path, self.fmt, self.schema = path, fmt, schema
+        self.tmp = path + ".tmp"
+        self.writer = None
+        self.first = True
+
+    def write(self, df):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.tmp, self.schema or table.schema)
+            self.writer.write_table(table)
+        else:
+            df.to_csv(self.tmp, mode="w" if self.first else "a", header=self.first, index=False)
+        self.first = False
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        os.replace(self.tmp, self.path)
+
+
+def generate(profile, units, output_dir=OUTPUT_DIR, fmt="csv", files=None, seed=0, chunk_elements=CHUNK_ELEMENTS) -> dict:
+    """Write every profiled file (or just `files`) for `units` consumer units. Returns {name: rows written}."""
+    if fmt == "parquet" and pq is None:
+        raise ImportError("Parquet output needs pyarrow: pip install pyarrow")
+    written = {}
+    for i, (name, file_profile) in enumerate(profile["files"].items()):
+        if files and name not in files and os.path.basename(name) not in files:
+            continue
+        sampler = FileSampler(name, file_profile, profile["quarters"])
+        target = os.path.join(output_dir, os.path.splitext(name)[0] + (".parquet" if fmt == "parquet" else ".csv"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        start, rows = time.perf_counter(), 0
+        writer = ChunkWriter(target, fmt, sampler.arrow_schema() if fmt == "parquet" else None)
+        step = sampler.units_per_chunk(chunk_elements)
+        for chunk, unit_start in enumerate(range(0, units, step)):
+            rng = np.random.default_rng([seed, i, chunk])
+            df = sampler.sample(unit_start, min(unit_start + step, units), rng)
+            writer.write(df)
+            rows += len(df)
+        writer.close()
+        written[name] = rows
+        logger.info(f"🧪 {name}: {rows:,} rows -> {os.path.relpath(target)} ({time.perf_counter() - start:.1f}s)")
+    return written
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="🪵 %(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Fit and generate synthetic CE-like data at any scale.")
+    parser.add_argument("--profile", default=PROFILE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_fit = sub.add_parser("fit", help="Learn a profile from real CE CSVs")
+    p_fit.add_argument("paths", nargs="*", default=[os.path.join(DATA_DIR, "intrvw23")], help="CSV files or directories")
+    p_fit.add_argument("--patterns", nargs="+", default=list(PIPELINE_PATTERNS), help="File patterns to profile ('*' for all)")
+    p_fit.add_argument("--report", default=REPORT_PATH)
+    p_gen = sub.add_parser("generate", help="Write synthetic files from a profile")
+    p_gen.add_argument("--units", type=int, help="Consumer units (NEWIDs) to generate")
+    p_gen.add_argument("--scale", type=float, default=1.0, help="Units as a multiple of the fitted release (if --units is not given)")
+    p_gen.add_argument("--output", default=OUTPUT_DIR)
+    p_gen.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    p_gen.add_argument("--files", nargs="+", help="Only these files, e.g. fmli232.csv mtbi232.csv")
+    p_gen.add_argument("--seed", type=int, default=0)
+    p_gen.add_argument("--chunk-elements", type=int, default=CHUNK_ELEMENTS, help="Rows x columns per chunk (bounds memory)")
+    args = parser.parse_args()
+
+    if args.command == "fit":
+        patterns = None if args.patterns == ["*"] else [p.lower() for p in args.patterns]
+        profile = fit(args.paths, patterns, args.report)
+        logger.info(f"✅ Profile of {len(profile['files'])} files, {profile['units']:,} units -> {save_profile(profile, args.profile)}")
+    else:
+        profile = load_profile(args.profile)
+        units = args.units or int(round(profile["units"] * args.scale))
+        written = generate(profile, units, args.output, args.format, args.files, args.seed, args.chunk_elements)
+        logger.info(f"🎉 {units:,} units, {sum(written.values()):,} rows in {len(written)} files under {args.output}")
@@ -0,0 +1,142 @@
+"""
+Disk cache of MCMC / VI results as ArviZ NetCDF, keyed by what produced them.
+
+The key hashes the input arrays, model source, sampler settings, seed and pymc/bambi versions,
+so any change means a fresh sample. Files are evicted least-recently-used once the cache
+exceeds its size limit.
+
+Environment:
+    TRACE_CACHE=0               disable (always sample, never store)
+    TRACE_CACHE_DIR=<path>      default: <repo>/.cache/traces
+    TRACE_CACHE_MAX_MB=<int>    default: 2048
+
+    trace = cached_sample(
+        lambda: pm.sample(...),
+        arrays={"group_a": group_a},
+        model=inspect.getsource(build_model),
+        sampler={"draws": 2000, "tune": 1000},
+        seed=42,
+    )
+"""
+import os
+import json
+import hashlib
+import logging
+import importlib.metadata
+import numpy as np
+import pandas as pd
+import arviz as az
+from instrument import stage
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.environ.get("TRACE_CACHE_DIR", os.path.join(BASE_DIR, ".cache", "traces"))
+MAX_BYTES = int(os.environ.get("TRACE_CACHE_MAX_MB", "2048")) * (1 << 20)
+VERSIONED_PACKAGES = ("pymc", "bambi", "pytensor", "arviz")
+
+
+def enabled() -> bool:
+    return os.environ.get("TRACE_CACHE", "1") not in ("0", "false", "no")
+
+
+def _package_versions():
+    versions = {}
+    for name in VERSIONED_PACKAGES:
+        try:
+            versions[name] = importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            continue
+    return versions
+
+
+def _update_with_array(digest, name, value):
+    digest.update(name.encode())
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(json.dumps([str(t) for t in np.atleast_1d(value.dtypes)]).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        return
+    array = np.ascontiguousarray(value)
+    digest.update(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(array.tobytes())
+
+
+def trace_key(arrays=None, model="", sampler=None, seed=None) -> str:
+    """sha256 over data, model definition, sampler settings, seed and library versions."""
+    digest = hashlib.sha256()
+    for name in sorted(arrays or {}):
+        _update_with_array(digest, name, arrays[name])
+    meta = {"model": model, "sampler": sampler or {}, "seed": seed, "versions": _package_versions()}
+    digest.update(json.dumps(meta, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.nc")
+
+
+def load(key, cache_dir=None):
+    path = _path(key, cache_dir or CACHE_DIR)
+    if not os.path.exists(path):
+        return None
+    try:
+        idata = az.from_netcdf(path)
+    except Exception as e:
+        logger.warning(f"Dropping unreadable cached trace {os.path.basename(path)}: {e}")
+        os.remove(path)
+        return None
+    os.utime(path)  # mark as recently used
+    return idata
+
+
+def store(key, idata, cache_dir=None, max_bytes=None):
+    cache_dir = cache_dir or CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _path(key, cache_dir)
+    tmp = path + ".tmp"
+    idata.to_netcdf(tmp)
+    os.replace(tmp, path)
+    evict(cache_dir, max_bytes if max_bytes is not None else MAX_BYTES, keep=path)
+    return path
+
+
+def evict(cache_dir=None, max_bytes=None, keep=None):
+    """Delete least-recently-used traces until the cache fits in max_bytes."""
+    cache_dir = cache_dir or CACHE_DIR
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".nc"):
+            path = os.path.join(cache_dir, name)
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        os.remove(path)
+        total -= size
+        logger.info(f"Evicted cached trace {os.path.basename(path)}")
+
+
+def cached_sample(sample_fn, arrays=None, model="", sampler=None, seed=None, cache_dir=None):
+    """Return the cached InferenceData for this key, or call sample_fn() and store its result."""
+    with stage("sample") as s:
+        if not enabled():
+            s.add(cache="off")
+            return sample_fn()
+
+        key = trace_key(arrays, model, sampler, seed)
+        idata = load(key, cache_dir)
+        if idata is not None:
+            logger.info(f"♻️ Using cached trace {key[:12]}")
+            s.add(cache="hit")
+            return idata
+
+        idata = sample_fn()
+        store(key, idata, cache_dir)
+        logger.info(f"💾 Cached trace {key[:12]}")
+        s.add(cache="miss")
+        return idata
@@ -1,29 +1,84 @@
+"""
+Frequentist checks of spending by income, next to the Bayesian A/B results.
+
+With no options this is the original one-sample z-test of the high-income group against a
+population mean. --by or --segments runs the batched tests of frequentist.py over every
+segment x metric pair instead.
+
+Usage:
+    python bin/ztest_compare_high_income_to_population_avg.py
+    python bin/ztest_compare_high_income_to_population_avg.py --by region_code spending_class --correction bh
+    python bin/ztest_compare_high_income_to_population_avg.py --segments segments.json --metrics y total_annual_spending
+"""
+import json
+import time
+import argparse
 import pandas as pd
 import numpy as np
-from scipy.stats import norm
+from ab_stats import cross_segments
+from columnar_cache import read_csv_cached
+from frequentist import TESTS, CORRECTIONS, DEFAULT_RESAMPLES, one_sample_z, run_tests
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="z-test of high-income spending, or batched tests across segments.")
+    parser.add_argument("--data", default="data/consumer_spending.csv")
+    parser.add_argument("--population-mean", type=float, default=12000, help="Replace with domain-informed guess")
+    parser.add_argument("--population-std", type=float, default=3500, help="Replace with known or estimated std dev")
+    parser.add_argument("--by", nargs="+", help="Batched tests for every combination of these columns")
+    parser.add_argument("--segments", help="JSON file with a list of segment definitions (overrides --by)")
+    parser.add_argument("--metrics", nargs="+", default=["y"], help="y = log1p spending, as in the Bayesian A/B test")
+    parser.add_argument("--tests", nargs="+", choices=TESTS, default=list(TESTS))
+    parser.add_argument("--arm-col", default="income_range_code", help="A/B split at the median of this column")
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES)
+    parser.add_argument("--correction", choices=CORRECTIONS, default="holm")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--jobs", type=int, default=-1)
+    parser.add_argument("--output", help="Write the per-pair table as CSV")
+    args = parser.parse_args()
+
+    if not (args.by or args.segments):
+        # Load and clean data
+        df = read_csv_cached(args.data, columns=["total_annual_spending", "income_range_code"])
+        df = df.dropna(subset=["total_annual_spending", "income_range_code"])
+
+        # Determine Group B (High Income)
+        cutoff = df["income_range_code"].median()
+        group_b = df[df["income_range_code"] > cutoff]["total_annual_spending"].values
+
+        # Z-test against known population mean
+        z, p_val = one_sample_z(group_b.mean(), len(group_b), args.population_mean, args.population_std)
 
-# Load and clean data
-df = pd.read_csv("data/consumer_spending.csv")
-df = df.dropna(subset=["total_annual_spending", "income_range_code"])
+        print(f"Z = {z:.2f}")
+        print(f"p-value = {p_val:.4f}")
 
-# Determine Group B (High Income)
-cutoff = df["income_range_code"].median()
-group_b = df[df["income_range_code"] > cutoff]["total_annual_spending"].values
+        if p_val < args.alpha:
+            print("✅ Statistically significant: High-income group differs from population mean")
+        else:
+            print("⚠️ No significant difference detected")
+        raise SystemExit(0)
 
-# Z-test against known population mean
-sample_mean = group_b.mean()
-sample_size = len(group_b)
-population_mean = 12000  # Replace with domain-informed guess
-population_std = 3500    # Replace with known or estimated std dev
+    segments = None
+    if args.segments:
+        with open(args.segments) as f:
+            segments = json.load(f)
+    segment_cols = sorted({k for s in segments for k in s}) if segments else args.by
+    value_cols = [m for m in args.metrics if m != "y"]
+    df = read_csv_cached(args.data, columns=list(dict.fromkeys(["total_annual_spending", args.arm_col, *value_cols, *segment_cols])))
+    if segments is None:
+        segments = cross_segments(df, args.by)
 
-# Compute Z-statistic
-z = (sample_mean - population_mean) / (population_std / np.sqrt(sample_size))
-p_val = 2 * (1 - norm.cdf(abs(z)))
+    start = time.perf_counter()
+    results = run_tests(df, segments, args.metrics, args.tests, args.arm_col, args.resamples,
+                        args.correction, args.alpha, n_jobs=args.jobs)
+    elapsed = time.perf_counter() - start
+    n_tests = len(results) * len(args.tests)
+    print(f"🧮 {len(results)} segment x metric pairs, {n_tests} tests in {elapsed:.2f}s ({n_tests / elapsed:,.0f} tests/s)")
 
-print(f"Z = {z:.2f}")
-print(f"p-value = {p_val:.4f}")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(f"\n🧾 B - A per pair ({args.correction} correction):\n", results.drop(columns=segment_cols).round(4).to_string(index=False))
+    for col in [c for c in results if c.endswith("_adj")]:
+        print(f"   {col}: {int(np.sum(results[col] < args.alpha))} of {len(results)} significant at {args.alpha}")
 
-if p_val < 0.05:
-    print("✅ Statistically significant: High-income group differs from population mean")
-else:
-    print("⚠️ No significant difference detected")
\ No newline at end of file
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\n📄 Results written to {args.output}")
@@ -0,0 +1,36 @@
+import io
+import pandas as pd
+import ingest
+import pipeline
+
+FMLI_CSV = """NEWID,AGE_REF,EDUCA2,REGION,INCOMEY2,FINLWT21
+1,45,13,1,5,100
+2,,14,2,6,100
+3,52,15,,7,100
+4,38,16,4,8,100
+"""
+
+
+def _spending(newids):
+    return pd.DataFrame({"NEWID": newids, "TOTAL_SPENDING": [1000.0 * i for i in newids]})
+
+
+def test_load_fmli_blank_cells_are_dropped_by_build(tmp_path):
+    path = tmp_path / "fmli232.csv"
+    path.write_text(FMLI_CSV)
+
+    fmli = ingest.load_fmli(str(path))
+    assert fmli["AGE_REF"].isna().sum() == 1 and fmli["REGION"].isna().sum() == 1
+
+    out = pipeline.build_consumer_spending(fmli, _spending([1, 2, 3, 4]))
+    assert sorted(out["consumer_unit_id"]) == [1, 4]
+    assert list(out["region_code"]) == ["Northeast", "West"]
+
+
+def test_load_fmli_blank_cells_from_parquet_mirror(tmp_path, monkeypatch):
+    mirror = tmp_path / "fmli232.parquet"
+    pd.read_csv(io.StringIO(FMLI_CSV)).to_parquet(mirror)
+    monkeypatch.setattr(ingest, "_fresh_cache", lambda path: str(mirror))
+
+    fmli = ingest.load_fmli("fmli232.csv")
+    assert fmli["AGE_REF"].isna().sum() == 1 and fmli["REGION"].isna().sum() == 1